@@ -0,0 +1,101 @@
+"""
+Numba-ядра для AdvancedMetrics: однопроходные редукции по массивам float64.
+Если numba не установлена, NUMBA_AVAILABLE = False и AdvancedMetrics
+использует NumPy-реализации.
+"""
+import numpy as np
+
+from utils.helpers import njit, NUMBA_AVAILABLE
+
+
+@njit(cache=True, nogil=True, fastmath=True)
+def _mean_std(values, ddof):
+    """Среднее и стандартное отклонение за один проход (Welford)."""
+    mean = 0.0
+    m2 = 0.0
+    n = 0
+    for i in range(values.size):
+        n += 1
+        delta = values[i] - mean
+        mean += delta / n
+        m2 += delta * (values[i] - mean)
+    if n - ddof <= 0:
+        return mean, 0.0
+    return mean, np.sqrt(m2 / (n - ddof))
+
+
+@njit(cache=True, nogil=True, fastmath=True)
+def _sharpe(returns, rf, ann):
+    if returns.size < 2:
+        return 0.0
+    # Выборочное std (ddof=1): на коротких рядах популяционное завышает Шарп
+    mean, std = _mean_std(returns, 1)
+    if std < 1e-12:
+        return 0.0
+    return (mean - rf) / std * ann
+
+
+@njit(cache=True, nogil=True, fastmath=True)
+def _max_dd(balances):
+    if balances.size == 0:
+        return 0.0
+    peak = balances[0]
+    max_dd = 0.0
+    for i in range(balances.size):
+        if balances[i] > peak:
+            peak = balances[i]
+        dd = (peak - balances[i]) / peak
+        if dd > max_dd:
+            max_dd = dd
+    return max_dd
+
+
+@njit(cache=True, nogil=True, fastmath=True)
+def _profit_factor(revenues, costs, is_sell, is_buy):
+    gross_profit = 0.0
+    gross_loss = 0.0
+    for i in range(revenues.size):
+        if is_sell[i]:
+            gross_profit += revenues[i]
+        elif is_buy[i]:
+            gross_loss += costs[i]
+    gross_loss = abs(gross_loss)
+    if gross_loss == 0.0:
+        return 10.0  # Если нет убытков
+    return gross_profit / gross_loss
+
+
+@njit(cache=True, nogil=True, fastmath=True)
+def _win_rate(revenues, costs):
+    if revenues.size == 0:
+        return 0.0
+    wins = 0
+    for i in range(revenues.size):
+        if revenues[i] > costs[i]:
+            wins += 1
+    return wins / revenues.size
+
+
+@njit(cache=True, nogil=True, fastmath=True)
+def _consistency(returns):
+    if returns.size < 2:
+        return 0.0
+    mean, std = _mean_std(returns, 0)
+    if mean == 0.0:
+        return 0.0
+    return 1.0 - std / mean
+
+
+def _warmup():
+    """Прогрев JIT-кеша, чтобы первая оценка поколения не платила за компиляцию."""
+    values = np.array([1.0, 1.1, 0.9], dtype=np.float64)
+    flags = np.array([True, False, True])
+    _sharpe(values, 0.0, 1.0)
+    _max_dd(values)
+    _profit_factor(values, values, flags, ~flags)
+    _win_rate(values, values)
+    _consistency(values)
+
+
+if NUMBA_AVAILABLE:
+    _warmup()
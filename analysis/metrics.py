@@ -1,43 +1,84 @@
+import math
 import numpy as np
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from typing import List, Dict, Any, Union
+from ._metrics_numba import NUMBA_AVAILABLE, _sharpe, _max_dd, _profit_factor, _win_rate, _consistency
+
+# Множитель годовой доходности с учетом минутных данных
+_SQRT_ANN = math.sqrt(365 * 24 * 12)
+
+
+@dataclass
+class TradeArrays:
+    """Сделки робота в виде столбцов (SoA): словари разбираются один раз."""
+    revenue: np.ndarray
+    cost: np.ndarray
+    is_sell: np.ndarray
+    is_buy: np.ndarray
+
 
 class AdvancedMetrics:
+    @staticmethod
+    def summarize(trades: List[Dict[str, Any]]) -> TradeArrays:
+        """Преобразует список сделок в массивы, общие для всех метрик по сделкам."""
+        n = len(trades)
+        revenue = np.fromiter((trade.get('revenue', 0.0) for trade in trades), dtype=np.float64, count=n)
+        cost = np.fromiter((trade.get('cost', 0.0) for trade in trades), dtype=np.float64, count=n)
+        actions = [trade.get('action') for trade in trades]
+        is_sell = np.fromiter((a == 'sell' for a in actions), dtype=np.bool_, count=n)
+        is_buy = np.fromiter((a == 'buy' for a in actions), dtype=np.bool_, count=n)
+        return TradeArrays(revenue=revenue, cost=cost, is_sell=is_sell, is_buy=is_buy)
+
     @staticmethod
     def calculate_sharpe_ratio(returns: List[float], risk_free_rate: float = 0.0) -> float:
-        if len(returns) < 2 or np.std(returns) == 0:
+        arr = np.asarray(returns, dtype=np.float64)
+        if NUMBA_AVAILABLE:
+            return float(_sharpe(arr, float(risk_free_rate), _SQRT_ANN))
+        if arr.size < 2:
+            return 0.0
+        std = arr.std(ddof=1)
+        if std < 1e-12:
             return 0.0
-        return (np.mean(returns) - risk_free_rate) / np.std(returns) * np.sqrt(365 * 24 * 12)  # Годовая доходность с учетом минутных данных
+        return float((arr.mean() - risk_free_rate) / std * _SQRT_ANN)
 
     @staticmethod
     def calculate_max_drawdown(balances: List[float]) -> float:
-        peak = balances[0]
-        max_drawdown = 0
-        for balance in balances:
-            if balance > peak:
-                peak = balance
-            drawdown = (peak - balance) / peak
-            if drawdown > max_drawdown:
-                max_drawdown = drawdown
-        return max_drawdown
+        if len(balances) == 0:
+            return 0.0
+        arr = np.asarray(balances, dtype=np.float64)
+        if NUMBA_AVAILABLE:
+            return float(_max_dd(arr))
+        # Векторизованный расчет: накопленный максимум вместо цикла по барам
+        peaks = np.maximum.accumulate(arr)
+        drawdowns = (peaks - arr) / peaks
+        return float(drawdowns.max(initial=0.0))
 
     @staticmethod
-    def calculate_profit_factor(trades: List[Dict[str, Any]]) -> float:
-        gross_profit = sum(trade.get('revenue', 0) for trade in trades if trade.get('action') == 'sell')
-        gross_loss = abs(sum(trade.get('cost', 0) for trade in trades if trade.get('action') == 'buy'))
-        
+    def calculate_profit_factor(trades: Union[List[Dict[str, Any]], TradeArrays]) -> float:
+        arrays = trades if isinstance(trades, TradeArrays) else AdvancedMetrics.summarize(trades)
+        if NUMBA_AVAILABLE:
+            return float(_profit_factor(arrays.revenue, arrays.cost, arrays.is_sell, arrays.is_buy))
+        gross_profit = arrays.revenue[arrays.is_sell].sum()
+        gross_loss = abs(arrays.cost[arrays.is_buy].sum())
+
         if gross_loss == 0:
             return 10.0  # Если нет убытков
-        return gross_profit / gross_loss
+        return float(gross_profit / gross_loss)
 
     @staticmethod
-    def calculate_win_rate(trades: List[Dict[str, Any]]) -> float:
-        if not trades:
+    def calculate_win_rate(trades: Union[List[Dict[str, Any]], TradeArrays]) -> float:
+        arrays = trades if isinstance(trades, TradeArrays) else AdvancedMetrics.summarize(trades)
+        if NUMBA_AVAILABLE:
+            return float(_win_rate(arrays.revenue, arrays.cost))
+        if arrays.revenue.size == 0:
             return 0.0
-        profitable_trades = sum(1 for trade in trades if trade.get('revenue', 0) > trade.get('cost', 0))
-        return profitable_trades / len(trades)
+        profitable_trades = np.count_nonzero(arrays.revenue > arrays.cost)
+        return profitable_trades / arrays.revenue.size
 
     @staticmethod
     def calculate_consistency(returns: List[float]) -> float:
+        if NUMBA_AVAILABLE:
+            return float(_consistency(np.asarray(returns, dtype=np.float64)))
         if len(returns) < 2:
             return 0.0
-        return 1 - (np.std(returns) / np.mean(returns)) if np.mean(returns) != 0 else 0.0
\ No newline at end of file
+        return 1 - (np.std(returns) / np.mean(returns)) if np.mean(returns) != 0 else 0.0
@@ -6,54 +6,66 @@ class RaceVisualizer:
     def __init__(self, evolution_manager):
         self.em = evolution_manager
         self.fig, self.ax = plt.subplots(figsize=(15, 8))
-        self.scatter = None
-        self.annotation = None
-        
+        self.setup_plot()
+        # Артисты создаются один раз; update только меняет их данные (нужно для blit)
+        self.scatter = self.ax.scatter([], [], s=[], alpha=0.5, animated=True)
+        capacity = int(self.em.config.get('population_size', 0)) or len(self.em.population)
+        self._labels = []
+        self._ensure_labels(capacity)
+
     def setup_plot(self):
         self.ax.set_xlim(0, 100)
         self.ax.set_ylim(0, 100)
         self.ax.set_title('Эволюционная гонка торговых роботов')
         self.ax.set_xlabel('Производительность')
         self.ax.set_ylabel('Роботы')
-        
+
+    def _ensure_labels(self, count):
+        """Дорастить пул подписей до count (скрытые по умолчанию)."""
+        while len(self._labels) < count:
+            self._labels.append(self.ax.text(0, 0, "", fontsize=8, animated=True, visible=False))
+
+    def init_plot(self):
+        return (self.scatter, *self._labels)
+
     def update(self, frame=None):
-        if not self.em.population:
-            return
-            
-        # Обновляем данные
-        profits = [robot.current_profit for robot in self.em.population]
-        sizes = [max(10.0, abs(profit) * 1000.0) for profit in profits]  # Минимальный размер точки
-        cycles = [robot.survived_cycles for robot in self.em.population]
-        children = [robot.children_count for robot in self.em.population]
-        ids = [robot.robot_id for robot in self.em.population]
-        
-        # Очищаем и перерисовываем
-        self.ax.clear()
-        self.setup_plot()
-        
-        scatter = self.ax.scatter(profits, range(len(profits)), s=sizes, alpha=0.5)
-        
-        # Добавляем аннотации
-        for i, (profit, cycle, child, id_val) in enumerate(zip(profits, cycles, children, ids)):
-            self.ax.annotate(f"ID:{id_val}\nC:{cycle}\nCh:{child}", 
-                            (profit, i), fontsize=8)
-        
-        return scatter,
-        
+        profits = self.em.profits
+        n = profits.size
+        if n == 0:
+            return self.init_plot()
+
+        # Обновляем данные из SoA-массивов менеджера
+        ids = self.em.ids
+        cycles = self.em.cycles
+        children = self.em.children
+        sizes = np.maximum(10.0, np.abs(profits) * 1000.0)  # Минимальный размер точки
+
+        self.scatter.set_offsets(np.column_stack([profits, np.arange(n)]))
+        self.scatter.set_sizes(sizes)
+
+        # Переиспользуем подписи вместо создания новых на каждом кадре
+        self._ensure_labels(n)
+        for i in range(n):
+            label = self._labels[i]
+            label.set_position((profits[i], i))
+            label.set_text(f"ID:{ids[i]}\nC:{cycles[i]}\nCh:{children[i]}")
+            label.set_visible(True)
+        for label in self._labels[n:]:
+            label.set_visible(False)
+
+        return self.init_plot()
+
     def animate(self):
-        ani = FuncAnimation(self.fig, self.update, interval=1000, blit=True)
+        ani = FuncAnimation(self.fig, self.update, init_func=self.init_plot, interval=1000, blit=True)
         plt.show()
 
 class MetricsVisualizer:
     def plot_generation_metrics(self, evolution_manager):
-        history = evolution_manager.history
-        if not history:
+        best_fitness = evolution_manager.best_fitness_history
+        avg_fitness = evolution_manager.avg_fitness_history
+        if best_fitness.size == 0:
             return
-        generations = range(len(history))
-        # История может не содержать ключ 'best_fitness' — возьмем из best_robot.fitness
-        best_fitness = [gen.get('best_fitness', gen.get('best_robot', {}).get('fitness', np.nan))
-                        for gen in history]
-        avg_fitness = [gen.get('avg_fitness', np.nan) for gen in history]
+        generations = np.arange(best_fitness.size)
         
         plt.figure(figsize=(12, 6))
         plt.plot(generations, best_fitness, label='Лучшая приспособленность', marker='o')
@@ -0,0 +1,60 @@
+"""
+GPU-визуализация гонки роботов на vispy для больших популяций.
+Точки загружаются одним буфером вершин за кадр из SoA-массивов EvolutionManager.
+"""
+import numpy as np
+
+try:
+    from vispy import app, scene
+    VISPY_AVAILABLE = True
+except ImportError:
+    VISPY_AVAILABLE = False
+
+from .visualizer import RaceVisualizer
+
+_PROFIT_COLOR = np.array([0.15, 0.65, 0.60, 0.5], dtype=np.float32)
+_LOSS_COLOR = np.array([0.94, 0.33, 0.31, 0.5], dtype=np.float32)
+
+
+class RaceVisualizerGL:
+    def __init__(self, evolution_manager, interval: float = 1.0):
+        self.em = evolution_manager
+        self.canvas = scene.SceneCanvas(title='Эволюционная гонка торговых роботов',
+                                        size=(1500, 800), keys='interactive', show=False)
+        self.view = self.canvas.central_widget.add_view()
+        self.view.camera = scene.PanZoomCamera(rect=(0, 0, 100, 100))
+        self.markers = scene.visuals.Markers(parent=self.view.scene)
+        # Подписи как в matplotlib-версии (ID, циклы, потомки); один визуал на все точки
+        self.labels = scene.visuals.Text(parent=self.view.scene, color='white', font_size=6,
+                                         anchor_x='left', anchor_y='bottom')
+        self.timer = app.Timer(interval=interval, connect=self.update, start=False)
+
+    def update(self, event=None):
+        profits = self.em.profits
+        n = profits.size
+        if n == 0:
+            return
+
+        pos = np.column_stack([profits, np.arange(n)]).astype(np.float32)
+        # В matplotlib s — площадь точки, в vispy size — диаметр в пикселях
+        sizes = np.sqrt(np.maximum(10.0, np.abs(profits) * 1000.0)).astype(np.float32)
+        colors = np.where((profits >= 0)[:, None], _PROFIT_COLOR, _LOSS_COLOR)
+        self.markers.set_data(pos, size=sizes, face_color=colors, edge_width=0)
+
+        ids, cycles, children = self.em.ids, self.em.cycles, self.em.children
+        # vispy рисует подпись одной строкой, поэтому поля через пробел, а не через \n
+        self.labels.text = [f"ID:{ids[i]} C:{cycles[i]} Ch:{children[i]}" for i in range(n)]
+        self.labels.pos = pos
+
+    def animate(self):
+        self.update()
+        self.canvas.show()
+        self.timer.start()
+        app.run()
+
+
+def create_race_visualizer(evolution_manager):
+    """RaceVisualizerGL, если установлен vispy, иначе matplotlib RaceVisualizer."""
+    if VISPY_AVAILABLE:
+        return RaceVisualizerGL(evolution_manager)
+    return RaceVisualizer(evolution_manager)
@@ -1,5 +1,5 @@
 """
-Backtrader integration: lightweight engine and PandasData mapping for offline backtests.
+Backtrader integration: lightweight engine and NumPy OHLCV feed for offline backtests.
 """
 import os
 import sys
@@ -10,27 +10,51 @@ if 'talib' in sys.modules:
 os.environ.setdefault('BTA_NO_TALIB', '1')
 
 import backtrader as bt
+import numpy as np
 import pandas as pd
-from dataclasses import dataclass
-from typing import Dict, Any, Type, Optional
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Any, List, Tuple, Type, Optional
 
 
-class PandasData(bt.feeds.PandasData):
-    """Map our common OHLCV DataFrame to Backtrader feed.
-    Expected columns:
-      - open_time (datetime-like)
-      - open, high, low, close, volume
+class NumpyOHLCVFeed(bt.feed.DataBase):
+    """Feed over pre-extracted NumPy OHLCV columns.
+    The arrays dict is shared between runs and never copied; only the read index is per feed.
     """
     params = (
-        ("datetime", "open_time"),
-        ("open", "open"),
-        ("high", "high"),
-        ("low", "low"),
-        ("close", "close"),
-        ("volume", "volume"),
-        ("openinterest", None),
+        ("arrays", None),
     )
 
+    def start(self):
+        super().start()
+        self._idx = -1
+
+    def _load(self):
+        self._idx += 1
+        arrays = self.p.arrays
+        i = self._idx
+        if i >= len(arrays['close']):
+            return False
+        self.lines.datetime[0] = arrays['datetime'][i]
+        self.lines.open[0] = arrays['open'][i]
+        self.lines.high[0] = arrays['high'][i]
+        self.lines.low[0] = arrays['low'][i]
+        self.lines.close[0] = arrays['close'][i]
+        self.lines.volume[0] = arrays['volume'][i]
+        self.lines.openinterest[0] = 0.0
+        return True
+
+
+FEED_COLUMNS = ('datetime', 'open', 'high', 'low', 'close', 'volume')
+
+
+def to_feed_arrays(data: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Extract OHLCV columns (and Backtrader date numbers) from our common DataFrame once."""
+    arrays = {k: data[k].to_numpy(np.float64) for k in ('open', 'high', 'low', 'close', 'volume')}
+    open_time = pd.to_datetime(data['open_time'])
+    arrays['datetime'] = np.array([bt.date2num(dt) for dt in open_time.dt.to_pydatetime()], dtype=np.float64)
+    return arrays
+
 
 @dataclass
 class BacktestResult:
@@ -43,21 +67,53 @@ class BacktestResult:
     total_trades: int
     win_rate_pct: float
     parameters: Dict[str, Any]
+    # Recorded by strategies that keep them (GeneDrivenBtStrategy); empty otherwise
+    buy_signals: List[Tuple[datetime, float]] = field(default_factory=list)
+    sell_signals: List[Tuple[datetime, float]] = field(default_factory=list)
+    exit_signals: List[Tuple[datetime, float]] = field(default_factory=list)
+    equity_curve: List[Tuple[datetime, float]] = field(default_factory=list)
 
 
 class BacktestEngine:
-    def __init__(self, initial_cash: float = 1000.0, commission: float = 0.0006):
+    def __init__(self, initial_cash: float = 1000.0, commission: float = 0.0006, exactbars: int = 0,
+                 data: Optional[pd.DataFrame] = None, arrays: Optional[Dict[str, np.ndarray]] = None):
         self.initial_cash = float(initial_cash)
         self.commission = float(commission)
+        # exactbars=1 saves memory but makes Backtrader disable preload/runonce,
+        # so it is off by default: for our data sizes speed matters more.
+        self.exactbars = int(exactbars)
+        # DataFrame -> NumPy columns are converted once and reused across runs
+        self._data: Optional[pd.DataFrame] = None
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+        if data is not None:
+            self._feed_arrays(data)
+        elif arrays is not None:
+            # Ready feed arrays (FEED_COLUMNS), e.g. views over shared memory: used as is, never copied
+            self._arrays = arrays
+
+    def _feed_arrays(self, data: Optional[pd.DataFrame]) -> Dict[str, np.ndarray]:
+        if data is None:
+            if self._arrays is None:
+                raise ValueError("No data passed to BacktestEngine")
+            return self._arrays
+        if data is not self._data:
+            self._arrays = to_feed_arrays(data)
+            self._data = data
+        return self._arrays
 
     def run(self,
             strategy_cls: Type[bt.Strategy],
-            data: pd.DataFrame,
+            data: Optional[pd.DataFrame] = None,
             strategy_params: Optional[Dict[str, Any]] = None,
             timeframe: str = "5m",
             printlog: bool = False) -> BacktestResult:
-        cerebro = bt.Cerebro()
-        cerebro.adddata(PandasData(dataname=data))
+        # runonce/preload: indicators are computed vectorized over the whole series before the run;
+        # stdstats=False: the default observers are not needed for the metrics
+        # Vectorized strategies (vectorized=True) compute indicators over the whole series in start():
+        # they need preload, which exactbars>=1 disables
+        exactbars = 0 if getattr(strategy_cls, 'vectorized', False) else self.exactbars
+        cerebro = bt.Cerebro(stdstats=False, runonce=True, preload=True, exactbars=exactbars)
+        cerebro.adddata(NumpyOHLCVFeed(arrays=self._feed_arrays(data)))
         cerebro.broker.setcash(self.initial_cash)
         cerebro.broker.setcommission(commission=self.commission)
 
@@ -104,4 +160,8 @@ class BacktestEngine:
             total_trades=total_trades,
             win_rate_pct=win_rate,
             parameters=strategy_params or {},
+            buy_signals=getattr(strat, 'buy_signals', []),
+            sell_signals=getattr(strat, 'sell_signals', []),
+            exit_signals=getattr(strat, 'exit_signals', []),
+            equity_curve=getattr(strat, 'equity_curve', []),
         )
\ No newline at end of file
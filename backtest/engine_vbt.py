@@ -0,0 +1,176 @@
+"""
+Vectorized batch backtests on vectorbt: the whole population of gene parameter sets
+is evaluated with one Portfolio.from_signals call over 2-D (bars x genes) signal matrices.
+Use BacktestEngine (Backtrader) for single-strategy validation; time-based exits
+(max_bars_in_pos) are only supported there.
+Indicators come from backtest.indicators_numba (Wilder RSI, SMA-seeded EMA), the same kernels
+GeneDrivenBtStrategy uses, so both engines see identical indicator values for a gene.
+vectorbt is optional: importing this module works without it, VbtEngine() raises ImportError.
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional, Tuple
+
+from . import indicators_numba
+from .engine import BacktestResult
+
+try:
+    import vectorbt as vbt
+    VBT_AVAILABLE = True
+except ImportError:
+    vbt = None
+    VBT_AVAILABLE = False
+
+# Defaults mirror GeneDrivenBtStrategy.params
+_DEFAULT_PARAMS = dict(
+    trade_perc=0.1,
+    rsi_period=14,
+    rsi_buy=30.0,
+    rsi_sell=70.0,
+    ema_fast=12,
+    ema_slow=26,
+    volume_sma_period=20,
+    decision_tree=None,
+)
+
+_HOLD, _BUY, _SELL = 0, 1, 2
+_ACTION_CODES = {'hold': _HOLD, 'buy': _BUY, 'sell': _SELL}
+
+
+def _condition_mask(cond: Dict[str, Any], indicators: Dict[str, np.ndarray]) -> Optional[np.ndarray]:
+    """Boolean mask over bars for one decision-tree condition (None if it never applies)."""
+    current = indicators.get(cond.get('indicator'))
+    if current is None:
+        return None
+    op = cond.get('operator')
+    val = cond.get('value')
+
+    # If condition expects boolean equality
+    if op == '==' and isinstance(val, bool):
+        return current.astype(bool) == val
+
+    try:
+        target = float(val)
+    except Exception:
+        return None
+    current = current.astype(np.float64)
+    if op == '<':
+        return current < target
+    if op == '>':
+        return current > target
+    if op == '==':
+        return current == target
+    return None
+
+
+def _tree_signals(tree: List[Dict[str, Any]], indicators: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized first-match evaluation of a decision tree: (buy_mask, sell_mask)."""
+    n = len(next(iter(indicators.values())))
+    action = np.full(n, _HOLD, dtype=np.int8)
+    decided = np.zeros(n, dtype=bool)
+    for cond in tree:
+        mask = _condition_mask(cond, indicators)
+        if mask is None:
+            continue
+        hit = mask & ~decided
+        action[hit] = _ACTION_CODES.get(cond.get('action', 'hold'), _HOLD)
+        decided |= mask
+    return action == _BUY, action == _SELL
+
+
+def _indicator_matrix(name: str, values: np.ndarray, periods: List[int]) -> np.ndarray:
+    """(bars x genes) matrix of one indicator kernel; each distinct period is computed once."""
+    by_period = {p: getattr(indicators_numba, name)(values, p) for p in set(periods)}
+    return np.column_stack([by_period[p] for p in periods])
+
+
+class VbtEngine:
+    def __init__(self, initial_cash: float = 1000.0, commission: float = 0.0006, freq: Optional[str] = None):
+        if not VBT_AVAILABLE:
+            raise ImportError("VbtEngine requires vectorbt (pip install vectorbt)")
+        self.initial_cash = float(initial_cash)
+        self.commission = float(commission)
+        # Bar frequency for annualized metrics (e.g. '5T'); inferred from the index if None
+        self.freq = freq
+
+    def run_batch(self, gene_params_list: List[Dict[str, Any]], df: pd.DataFrame) -> List[BacktestResult]:
+        """Backtest every parameter set in gene_params_list on df (open_time/open/high/low/close/volume)."""
+        if not gene_params_list:
+            return []
+        params = [{**_DEFAULT_PARAMS, **p} for p in gene_params_list]
+
+        indexed = df.set_index('open_time')
+        close = indexed['close'].astype(np.float64)
+        volume = indexed['volume'].astype(np.float64)
+
+        # Indicators for all genes at once: one column per parameter set
+        close_arr = close.to_numpy()
+        volume_arr = volume.to_numpy()
+        rsi = _indicator_matrix('rsi', close_arr, [int(p['rsi_period']) for p in params])
+        ema_fast = _indicator_matrix('ema', close_arr, [int(p['ema_fast']) for p in params])
+        ema_slow = _indicator_matrix('ema', close_arr, [int(p['ema_slow']) for p in params])
+        vol_sma = _indicator_matrix('sma', volume_arr, [int(p['volume_sma_period']) for p in params])
+
+        close_col = close_arr[:, None]
+        volume_col = volume_arr[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vol_ratio = np.where(vol_sma != 0, volume_col / vol_sma, 0.0)
+        indicators = {
+            'rsi': rsi,
+            'price_above_ema': close_col > ema_slow,
+            'price_below_ema': close_col < ema_slow,
+            'volume': vol_ratio,
+            'high_volume': vol_ratio,
+            'trend_alignment': ema_fast > ema_slow,
+        }
+        # Like Backtrader's minperiod: no signals until every indicator is defined
+        ready = ~(np.isnan(rsi) | np.isnan(ema_fast) | np.isnan(ema_slow) | np.isnan(vol_sma))
+
+        entries = np.zeros(rsi.shape, dtype=bool)
+        exits = np.zeros(rsi.shape, dtype=bool)
+        for j, p in enumerate(params):
+            tree = p.get('decision_tree') or []
+            if tree:
+                buy, sell = _tree_signals(tree, {k: v[:, j] for k, v in indicators.items()})
+            else:
+                # Fallback: simple RSI/EMA rule
+                buy = (rsi[:, j] < p['rsi_buy']) & (ema_fast[:, j] > ema_slow[:, j])
+                sell = rsi[:, j] > p['rsi_sell']
+            entries[:, j] = buy & ready[:, j]
+            exits[:, j] = sell & ready[:, j]
+
+        trade_perc = np.array([float(p['trade_perc']) for p in params])[None, :]
+        pf = vbt.Portfolio.from_signals(
+            close,
+            entries,
+            exits,
+            size=trade_perc,
+            size_type='percent',
+            fees=self.commission,
+            init_cash=self.initial_cash,
+            freq=self.freq,
+        )
+
+        final_values = np.asarray(pf.final_value(), dtype=np.float64).reshape(-1)
+        sharpes = np.nan_to_num(np.asarray(pf.sharpe_ratio(), dtype=np.float64).reshape(-1))
+        max_dds = np.nan_to_num(np.asarray(pf.max_drawdown(), dtype=np.float64).reshape(-1))
+        closed = pf.trades.closed
+        trade_counts = np.asarray(closed.count(), dtype=np.int64).reshape(-1)
+        win_rates = np.nan_to_num(np.asarray(closed.win_rate(), dtype=np.float64).reshape(-1))
+
+        results = []
+        for j, p in enumerate(gene_params_list):
+            final_value = float(final_values[j])
+            pnl = final_value - self.initial_cash
+            results.append(BacktestResult(
+                strategy_name=self.__class__.__name__,
+                final_value=final_value,
+                pnl=pnl,
+                return_pct=(pnl / self.initial_cash) * 100.0 if self.initial_cash else 0.0,
+                sharpe_ratio=float(sharpes[j]),
+                max_drawdown_pct=abs(float(max_dds[j])) * 100.0,
+                total_trades=int(trade_counts[j]),
+                win_rate_pct=float(win_rates[j]) * 100.0,
+                parameters=p,
+            ))
+        return results
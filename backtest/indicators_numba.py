@@ -0,0 +1,71 @@
+"""
+One-shot indicator kernels over full close/volume arrays (Numba-compiled when available).
+Values before the warm-up period are NaN, matching Backtrader's minperiod semantics.
+"""
+import numpy as np
+
+from utils.helpers import njit
+
+
+@njit(cache=True)
+def rsi(close, n):
+    """Wilder's RSI (same smoothing as bt.indicators.RSI)."""
+    out = np.full(close.size, np.nan)
+    if close.size <= n:
+        return out
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, n + 1):
+        delta = close[i] - close[i - 1]
+        if delta > 0:
+            avg_gain += delta
+        else:
+            avg_loss -= delta
+    avg_gain /= n
+    avg_loss /= n
+    for i in range(n, close.size):
+        if i > n:
+            delta = close[i] - close[i - 1]
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+            avg_gain = (avg_gain * (n - 1) + gain) / n
+            avg_loss = (avg_loss * (n - 1) + loss) / n
+        if avg_loss == 0.0:
+            out[i] = 100.0
+        else:
+            out[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return out
+
+
+@njit(cache=True)
+def ema(close, n):
+    """EMA seeded with the SMA of the first n values (as bt.indicators.EMA)."""
+    out = np.full(close.size, np.nan)
+    if close.size < n:
+        return out
+    alpha = 2.0 / (n + 1.0)
+    value = 0.0
+    for i in range(n):
+        value += close[i]
+    value /= n
+    out[n - 1] = value
+    for i in range(n, close.size):
+        value = alpha * close[i] + (1.0 - alpha) * value
+        out[i] = value
+    return out
+
+
+@njit(cache=True)
+def sma(values, n):
+    """Simple moving average with a running window sum."""
+    out = np.full(values.size, np.nan)
+    if values.size < n:
+        return out
+    total = 0.0
+    for i in range(values.size):
+        total += values[i]
+        if i >= n:
+            total -= values[i - n]
+        if i >= n - 1:
+            out[i] = total / n
+    return out
@@ -0,0 +1,44 @@
+"""
+On-disk cache for paginated Bybit kline downloads used by the backtest scripts.
+Frames are stored with pandas' pickle format (no extra dependency) and expire after a TTL,
+since the most recent candles keep changing.
+"""
+import functools
+import hashlib
+import inspect
+import os
+import time
+from typing import Callable
+
+import pandas as pd
+
+KLINES_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'bybit_bot', 'klines')
+KLINES_CACHE_TTL = 3600.0
+
+
+def cached_klines(loader: Callable[..., pd.DataFrame]) -> Callable[..., pd.DataFrame]:
+    """Decorate load_bybit_klines(symbol, interval, limit=..., ...) with a disk cache
+    keyed on (symbol, interval, limit). Empty results are not cached."""
+    signature = inspect.signature(loader)
+
+    @functools.wraps(loader)
+    def wrapper(*args, **kwargs) -> pd.DataFrame:
+        # Bind against the loader's own signature so its defaults (e.g. limit) form the key
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        symbol, interval, limit = (bound.arguments[k] for k in ('symbol', 'interval', 'limit'))
+        key = hashlib.sha256(f"{symbol}|{interval}|{limit}".encode()).hexdigest()
+        path = os.path.join(KLINES_CACHE_DIR, f"{key}.pkl")
+        try:
+            if time.time() - os.path.getmtime(path) < KLINES_CACHE_TTL:
+                return pd.read_pickle(path)
+        except (OSError, ValueError, EOFError):
+            pass  # missing, expired or unreadable: fetch again
+        df = loader(*bound.args, **bound.kwargs)
+        if not df.empty:
+            os.makedirs(KLINES_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            df.to_pickle(tmp_path)
+            os.replace(tmp_path, path)
+        return df
+    return wrapper
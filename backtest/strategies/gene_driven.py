@@ -1,6 +1,22 @@
+import operator
+
 import backtrader as bt
+import numpy as np
+
+from backtest import indicators_numba
+
+_OPERATORS = {'<': operator.lt, '>': operator.gt, '==': operator.eq}
+_TREE_INDICATORS = frozenset({'rsi', 'price_above_ema', 'price_below_ema', 'high_volume', 'volume',
+                              'trend_alignment'})
+# Per-bar action codes
+_HOLD, _BUY, _SELL = 0, 1, 2
+_ACTION_CODES = {'hold': _HOLD, 'buy': _BUY, 'sell': _SELL}
 
 class GeneDrivenBtStrategy(bt.Strategy):
+    # Indicators and actions are computed over the whole preloaded series in start():
+    # BacktestEngine runs such strategies with exactbars=0 (preload stays on)
+    vectorized = True
+
     params = dict(
         # Map of gene-like parameters. Tune these from your evolution gene.
         trade_perc=0.1,          # fraction of cash per trade
@@ -13,87 +29,144 @@ class GeneDrivenBtStrategy(bt.Strategy):
         decision_tree=None,      # List[ {indicator, operator, value, action} ]
         max_bars_in_pos=0,       # 0 disables time-based exit; >0 closes after N bars
         force_first_entry=False,  # testing aid: take first available entry
+        indicator_cache=None,    # dict shared by runs over the SAME data: (name, period) -> array
         printlog=False,
     )
 
     def __init__(self):
-        # Indicators (common baselines)
-        self.rsi = bt.indicators.RSI(self.data.close, period=self.p.rsi_period)
-        self.ema_fast = bt.indicators.EMA(self.data.close, period=self.p.ema_fast)
-        self.ema_slow = bt.indicators.EMA(self.data.close, period=self.p.ema_slow)
-        self.vol_sma = bt.indicators.SMA(self.data.volume, period=self.p.volume_sma_period)
+        # Indicators are precomputed over the whole series in start(); keep Backtrader's
+        # warm-up so next() is only called once every indicator is defined
+        self.addminperiod(max(int(self.p.rsi_period) + 1, int(self.p.ema_fast),
+                              int(self.p.ema_slow), int(self.p.volume_sma_period)))
+        self._rsi_arr = self._ema_fast_arr = self._ema_slow_arr = self._vol_sma_arr = None
+        self._close_arr = self._volume_arr = None
+        # Decision tree resolved once; per-bar actions are computed as masks in start()
+        self._tree = self._compile_tree(self.p.decision_tree or [])
+        self._actions = None
 
         # Track pending order to avoid stacking
         self.order = None
         self.bars_in_pos = 0
         self.did_first_entry = False
 
+        # Report data, read by BacktestEngine after the run: (datetime, price) per signal
+        # and (datetime, portfolio value) per bar
+        self.buy_signals = []
+        self.sell_signals = []
+        self.exit_signals = []
+        self.equity_curve = []
+        self._equity_num = []  # (Backtrader date number, value); converted to datetimes in stop()
+
+    def start(self):
+        # Without preload (or with exactbars >= 1, which disables it and bounds the line buffers)
+        # data.close.array is not the full series and per-bar indices would not line up
+        if not self.env.p.preload or int(self.env.p.exactbars or 0) >= 1:
+            raise ValueError(f"{self.__class__.__name__} requires preload=True and exactbars=0")
+        self._compute_indicators()
+
+    def _compute_indicators(self):
+        """Run the indicator kernels once over the (preloaded) close/volume arrays."""
+        self._close_arr = np.asarray(self.data.close.array, dtype=np.float64)
+        self._volume_arr = np.asarray(self.data.volume.array, dtype=np.float64)
+        self._rsi_arr = self._indicator('rsi', self._close_arr, int(self.p.rsi_period))
+        self._ema_fast_arr = self._indicator('ema', self._close_arr, int(self.p.ema_fast))
+        self._ema_slow_arr = self._indicator('ema', self._close_arr, int(self.p.ema_slow))
+        self._vol_sma_arr = self._indicator('sma', self._volume_arr, int(self.p.volume_sma_period))
+        self._actions = self._compute_actions()
+
+    def _indicator(self, name, values, period):
+        """Kernel result, reused from p.indicator_cache when another run already computed it."""
+        cache = self.p.indicator_cache
+        key = (name, period)
+        if cache is not None:
+            cached = cache.get(key)
+            # Length check: the cache must come from a run over the same data
+            if cached is not None and cached.size == values.size:
+                return cached
+        out = getattr(indicators_numba, name)(values, period)
+        if cache is not None:
+            cache[key] = out
+        return out
+
     def log(self, txt):
         if self.p.printlog:
             dt = self.datas[0].datetime.datetime(0)
             print(f"{dt} - {txt}")
 
-    def _eval_condition(self, cond) -> bool:
-        ind = cond.get('indicator')
-        op = cond.get('operator')
-        val = cond.get('value')
-        # Map indicators to current values
-        current = None
+    def _indicator_series(self, ind):
+        """Whole-series array for a decision-tree indicator (from the arrays computed in start())."""
         if ind == 'rsi':
-            current = float(self.rsi[0])
-        elif ind == 'price_above_ema':
-            current = float(self.data.close[0] > self.ema_slow[0])
-        elif ind == 'price_below_ema':
-            current = float(self.data.close[0] < self.ema_slow[0])
-        elif ind in ('high_volume', 'volume'):
+            return self._rsi_arr
+        if ind == 'price_above_ema':
+            return (self._close_arr > self._ema_slow_arr).astype(np.float64)
+        if ind == 'price_below_ema':
+            return (self._close_arr < self._ema_slow_arr).astype(np.float64)
+        if ind in ('high_volume', 'volume'):
             # Treat as ratio vs SMA
-            if self.vol_sma[0] != 0:
-                current = float(self.data.volume[0] / self.vol_sma[0])
-            else:
-                current = 0.0
-        elif ind == 'trend_alignment':
-            current = float(self.ema_fast[0] > self.ema_slow[0])
-        else:
-            return False
-
-        # If condition expects boolean equality
-        if op == '==' and isinstance(val, bool):
-            return bool(current) == val
-
-        # Numeric comparisons
-        try:
-            current_val = float(current)
-            target = float(val)
-        except Exception:
-            return False
-
-        if op == '<':
-            return current_val < target
-        if op == '>':
-            return current_val > target
-        if op == '==':
-            return current_val == target
-        return False
-
-    def _decide_action(self) -> str:
-        # If no decision_tree provided, fall back to simple RSI/EMA rule
-        tree = self.p.decision_tree or []
-        if not tree:
-            if (self.rsi[0] < self.p.rsi_buy) and (self.ema_fast[0] > self.ema_slow[0]):
-                return 'buy'
-            if (self.rsi[0] > self.p.rsi_sell) and self.position.size > 0:
-                return 'sell'
-            return 'hold'
-        # Evaluate all conditions; if any action mapped conditions satisfied, choose first match
+            sma = self._vol_sma_arr
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(sma != 0, self._volume_arr / sma, 0.0)
+        if ind == 'trend_alignment':
+            return (self._ema_fast_arr > self._ema_slow_arr).astype(np.float64)
+        return None
+
+    def _compile_tree(self, tree):
+        """Resolve operators, values and actions once: list of (indicator, op, value, action code).
+        Conditions that can never match are dropped."""
+        compiled = []
         for cond in tree:
-            try:
-                if self._eval_condition(cond):
-                    return cond.get('action', 'hold')
-            except Exception:
-                continue
-        return 'hold'
+            op = _OPERATORS.get(cond.get('operator'))
+            if op is None or cond.get('indicator') not in _TREE_INDICATORS:
+                continue  # never matches
+            val = cond.get('value')
+            if not (op is operator.eq and isinstance(val, bool)):
+                # Boolean values are compared as truthiness; everything else numerically
+                try:
+                    val = float(val)
+                except Exception:
+                    continue
+            action = _ACTION_CODES.get(cond.get('action', 'hold'), _HOLD)
+            compiled.append((cond.get('indicator'), op, val, action))
+        return compiled
+
+    def _compute_actions(self):
+        """Per-bar action codes for the whole series: one boolean mask per condition,
+        the first satisfied condition (in tree order) wins, as in the bar-by-bar rule."""
+        n = self._close_arr.size
+        if not self._tree:
+            if self.p.decision_tree:
+                return np.full(n, _HOLD, dtype=np.int8)
+            # No decision_tree provided: fall back to simple RSI/EMA rule
+            # (the sell branch only fires with an open position, checked in next())
+            buy = (self._rsi_arr < float(self.p.rsi_buy)) & (self._ema_fast_arr > self._ema_slow_arr)
+            sell = self._rsi_arr > float(self.p.rsi_sell)
+            return np.where(buy, _BUY, np.where(sell, _SELL, _HOLD)).astype(np.int8)
+
+        series = {}
+        masks = np.empty((len(self._tree), n), dtype=bool)
+        codes = np.empty(len(self._tree) + 1, dtype=np.int8)
+        for row, (ind, op, val, code) in enumerate(self._tree):
+            arr = series.get(ind)
+            if arr is None:
+                arr = series[ind] = self._indicator_series(ind)
+            if isinstance(val, bool):
+                masks[row] = (arr != 0) == val  # truthiness as bool(): NaN counts as True
+            else:
+                masks[row] = op(arr, val)
+            codes[row] = code
+        codes[-1] = _HOLD
+        # Row of the first true mask per bar; the extra code covers bars where none matched
+        first = np.where(masks.any(axis=0), masks.argmax(axis=0), len(self._tree))
+        return codes[first]
+
+    def stop(self):
+        self.equity_curve = [(bt.num2date(dt), value) for dt, value in self._equity_num]
+
+    def _mark(self, signals, price):
+        signals.append((self.data.datetime.datetime(0), price))
 
     def next(self):
+        self._equity_num.append((self.data.datetime[0], self.broker.getvalue()))
         if self.order:
             return  # wait for order resolution
 
@@ -107,27 +180,31 @@ class GeneDrivenBtStrategy(bt.Strategy):
             self.bars_in_pos += 1
             if int(self.p.max_bars_in_pos) > 0 and self.bars_in_pos >= int(self.p.max_bars_in_pos):
                 self.order = self.close()
+                self._mark(self.exit_signals, price)
                 self.log(f"TIME EXIT size={self.position.size} price={price:.2f} bars={self.bars_in_pos}")
                 self.bars_in_pos = 0
                 return
         else:
             self.bars_in_pos = 0
 
-        action = self._decide_action()
+        # Index of the current bar in the precomputed arrays
+        action = self._actions[len(self.data) - 1]
 
         # Optional forced first entry for testing
         if self.p.force_first_entry and not self.did_first_entry and not self.position:
-            action = 'buy'
+            action = _BUY
 
-        if action == 'buy' and not self.position:
+        if action == _BUY and not self.position:
             stake_value = cash * float(self.p.trade_perc)
             size = stake_value / price  # allow fractional crypto sizing
             if size > 0:
                 self.order = self.buy(size=size)
                 self.did_first_entry = True
+                self._mark(self.buy_signals, price)
                 self.log(f"BUY size={size:.6f} price={price:.2f}")
-        elif action == 'sell' and self.position:
+        elif action == _SELL and self.position:
             self.order = self.close()
+            self._mark(self.sell_signals, price)
             self.log(f"SELL EXIT size={self.position.size} price={price:.2f}")
         else:
             # hold
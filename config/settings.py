@@ -1,27 +1,47 @@
 # config/settings.py
+import functools
 import json
 import os
 from typing import Dict, Any
 
+try:
+    import orjson  # Быстрый разбор JSON, если установлен
+except ImportError:
+    orjson = None
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config.json')
+
 def load_config() -> Dict[str, Any]:
     """
     Загрузка конфигурации из файла config.json
     
+    Результат кешируется до изменения файла (по st_mtime_ns), поэтому
+    возвращаемый словарь общий для всех вызовов — не изменяйте его.
+    
     Returns:
         Dict[str, Any]: Словарь с настройками конфигурации
     """
-    config_path = os.path.join(os.path.dirname(__file__), '..', 'config.json')
-    
     try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        return config
+        mtime_ns = os.stat(CONFIG_PATH).st_mtime_ns
     except FileNotFoundError:
-        print(f"Файл конфигурации {config_path} не найден. Используются настройки по умолчанию.")
-        return get_default_config()
-    except json.JSONDecodeError:
-        print(f"Ошибка парсинга JSON в файле {config_path}. Используются настройки по умолчанию.")
-        return get_default_config()
+        print(f"Файл конфигурации {CONFIG_PATH} не найден. Используются настройки по умолчанию.")
+        return _DEFAULT_CONFIG
+    return _load_config_cached(mtime_ns)
+
+@functools.lru_cache(maxsize=1)
+def _load_config_cached(mtime_ns: int) -> Dict[str, Any]:
+    """Чтение и разбор config.json; ключ кеша — время модификации файла."""
+    try:
+        with open(CONFIG_PATH, 'rb') as f:
+            raw = f.read()
+        return orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except FileNotFoundError:
+        print(f"Файл конфигурации {CONFIG_PATH} не найден. Используются настройки по умолчанию.")
+        return _DEFAULT_CONFIG
+    except ValueError:
+        # json.JSONDecodeError и orjson.JSONDecodeError — подклассы ValueError
+        print(f"Ошибка парсинга JSON в файле {CONFIG_PATH}. Используются настройки по умолчанию.")
+        return _DEFAULT_CONFIG
 
 def get_default_config() -> Dict[str, Any]:
     """
@@ -36,6 +56,8 @@ def get_default_config() -> Dict[str, Any]:
         "timeframe": "5",
         "account_type": "UNIFIED",
         "generation_duration_minutes": 5,
+        "tick_sleep_seconds": 5.0,
+        "async_trading": False,
         "population_size": 50,
         "initial_balance": 1000.0,
         "global_trade_percentage": 0.1,
@@ -46,6 +68,9 @@ def get_default_config() -> Dict[str, Any]:
         }
     }
 
+# Конфигурация по умолчанию создается один раз
+_DEFAULT_CONFIG = get_default_config()
+
 # Для тестирования
 if __name__ == "__main__":
     config = load_config()
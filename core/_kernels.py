@@ -0,0 +1,30 @@
+"""
+Numba-ядра для BybitClient. Если numba не установлена, функции
+выполняются как обычный Python (см. utils.helpers.njit).
+"""
+import numpy as np
+
+from utils.helpers import njit, NUMBA_AVAILABLE
+
+
+@njit(cache=True, nogil=True)
+def vwap(qtys, prices):
+    """VWAP за один проход; 0.0, если суммарный объем не положительный."""
+    notional = 0.0
+    total_qty = 0.0
+    for i in range(qtys.size):
+        notional += qtys[i] * prices[i]
+        total_qty += qtys[i]
+    if total_qty <= 0.0:
+        return 0.0
+    return notional / total_qty
+
+
+def _warmup():
+    """Прогрев JIT-кеша, чтобы первая сделка не платила за компиляцию."""
+    values = np.array([1.0, 2.0], dtype=np.float64)
+    vwap(values, values)
+
+
+if NUMBA_AVAILABLE:
+    _warmup()
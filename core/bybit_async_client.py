@@ -0,0 +1,321 @@
+# core/bybit_async_client.py
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import random
+import time
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlencode
+
+import httpx
+import pandas as pd
+
+from .bybit_client import BybitClient, FALLBACK_CODES, FILL_POLL_DELAYS, FILL_POLL_JITTER, _fills_vwap, _long_qty_total
+
+try:
+    import orjson  # Быстрый разбор JSON-ответов, если установлен
+except ImportError:
+    orjson = None
+
+try:
+    import h2  # noqa: F401  # HTTP/2 для httpx требует пакет h2
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+logger = logging.getLogger('bybit_client')
+
+MAINNET_URL = "https://api.bybit.com"
+TESTNET_URL = "https://api-testnet.bybit.com"
+RECV_WINDOW = "5000"
+
+
+class BybitAPIError(Exception):
+    """Ошибка Bybit v5 (retCode != 0)."""
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"{message} (ErrCode: {status_code})")
+        self.status_code = status_code
+        self.message = message
+
+
+class BybitAsyncClient:
+    """Асинхронный клиент Bybit v5 поверх одного httpx.AsyncClient с keep-alive.
+    Повторяет API BybitClient, но методы — корутины. Фильтры инструментов и квантование
+    объема/цены берутся из синхронного BybitClient (они кешируются после первого запроса).
+    """
+
+    def __init__(self, testnet=True):
+        self.testnet = testnet
+        self._sync = BybitClient(testnet=testnet)
+        self.api_key = self._sync.api_key or ''
+        self.api_secret = self._sync.api_secret or ''
+        self._client = httpx.AsyncClient(
+            base_url=TESTNET_URL if testnet else MAINNET_URL,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            http2=_HTTP2,
+            timeout=30.0,
+        )
+        logger.info("BybitAsyncClient инициализирован")
+
+    async def close(self):
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _sign(self, payload: str) -> Dict[str, str]:
+        """Заголовки подписи v5: HMAC-SHA256(timestamp + api_key + recv_window + payload)."""
+        timestamp = str(int(time.time() * 1000))
+        to_sign = timestamp + self.api_key + RECV_WINDOW + payload
+        signature = hmac.new(self.api_secret.encode('utf-8'), to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+        return {
+            'X-BAPI-API-KEY': self.api_key,
+            'X-BAPI-TIMESTAMP': timestamp,
+            'X-BAPI-RECV-WINDOW': RECV_WINDOW,
+            'X-BAPI-SIGN': signature,
+            'X-BAPI-SIGN-TYPE': '2',
+        }
+
+    async def _request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                       signed: bool = False) -> Dict[str, Any]:
+        headers = {}
+        content = None
+        url = path
+        if method == 'GET':
+            # Подписывается ровно та строка запроса, которая уходит на биржу
+            payload = urlencode({k: v for k, v in (params or {}).items() if v is not None})
+            if payload:
+                url = f"{path}?{payload}"
+        else:
+            if orjson is not None:
+                payload = content = orjson.dumps(params or {}).decode('utf-8')
+            else:
+                payload = content = json.dumps(params or {}, separators=(',', ':'))
+            headers['Content-Type'] = 'application/json'
+        if signed:
+            headers.update(self._sign(payload))
+        response = await self._client.request(method, url, content=content, headers=headers)
+        response.raise_for_status()
+        data = orjson.loads(response.content) if orjson is not None else response.json()
+        if data.get('retCode') != 0:
+            raise BybitAPIError(data.get('retCode'), data.get('retMsg', ''))
+        return data
+
+    async def get_account_balance(self):
+        """Получение баланса аккаунта"""
+        try:
+            response = await self._request('GET', '/v5/account/wallet-balance',
+                                           {'accountType': 'UNIFIED'}, signed=True)
+            return float(response['result']['list'][0]['totalWalletBalance'])
+        except Exception as e:
+            logger.error("Ошибка при получении баланса: %s", e)
+            return 0.0
+
+    async def get_ticker(self, symbol):
+        """Получение информации о тикере"""
+        try:
+            response = await self._request('GET', '/v5/market/tickers', {'category': 'linear', 'symbol': symbol})
+            if response.get('result', {}).get('list'):
+                return response
+            return None
+        except Exception as e:
+            logger.error("Ошибка при получении тикера: %s", e)
+            return None
+
+    async def get_klines(self, symbol, interval, limit=100, start: int = None, end: int = None) -> pd.DataFrame:
+        """Получение свечей в виде DataFrame (как BybitClient.get_klines)"""
+        try:
+            response = await self._request('GET', '/v5/market/kline', {
+                'category': 'linear', 'symbol': symbol, 'interval': interval,
+                'limit': limit, 'start': start, 'end': end,
+            })
+            return BybitClient._klines_to_frame(response['result']['list'])
+        except Exception as e:
+            logger.error("Ошибка при получении свечей: %s", e)
+            return BybitClient._klines_to_frame([])
+
+    async def get_positions(self, symbol):
+        """Получение информации о позициях"""
+        try:
+            response = await self._request('GET', '/v5/position/list',
+                                           {'category': 'linear', 'symbol': symbol}, signed=True)
+            return response['result']['list']
+        except Exception as e:
+            logger.error("Ошибка при получении позиций: %s", e)
+            return []
+
+    async def get_open_orders(self, symbol):
+        """Получение списка открытых ордеров"""
+        try:
+            response = await self._request('GET', '/v5/order/realtime',
+                                           {'category': 'linear', 'symbol': symbol}, signed=True)
+            return response['result']['list']
+        except Exception as e:
+            logger.error("Ошибка при получении ордеров: %s", e)
+            return []
+
+    async def cancel_order(self, symbol, order_id):
+        """Отмена ордера"""
+        try:
+            response = await self._request('POST', '/v5/order/cancel',
+                                           {'category': 'linear', 'symbol': symbol, 'orderId': order_id}, signed=True)
+            logger.info("Ордер отменен: %s", response['result'])
+            return response['result']
+        except Exception as e:
+            logger.error("Ошибка при отмене ордера: %s", e)
+            return None
+
+    async def get_api_key_info(self):
+        """Получение информации о API ключе"""
+        try:
+            response = await self._request('GET', '/v5/user/query-api', signed=True)
+            return response['result']
+        except Exception as e:
+            logger.error("Ошибка при получении информации о API ключе: %s", e)
+            return None
+
+    async def _get_executions(self, symbol: str, order_id: str) -> List[dict]:
+        response = await self._request('GET', '/v5/execution/list',
+                                       {'category': 'linear', 'symbol': symbol, 'orderId': order_id}, signed=True)
+        return response['result'].get('list') or []
+
+    async def _get_order_history(self, symbol: str, order_id: str) -> List[dict]:
+        response = await self._request('GET', '/v5/order/history',
+                                       {'category': 'linear', 'symbol': symbol, 'orderId': order_id}, signed=True)
+        return response['result'].get('list') or []
+
+    async def _get_executed_price(self, symbol: str, order_id: str, delays=FILL_POLL_DELAYS) -> float:
+        """Получение средней цены исполнения ордера по orderId (VWAP по исполненным сделкам).
+        Executions и история ордера запрашиваются параллельно; avgPrice из истории — фолбэк.
+        """
+        history_price = 0.0
+        for attempt in range(len(delays) + 1):
+            if attempt:
+                await asyncio.sleep(delays[attempt - 1] + random.random() * FILL_POLL_JITTER)
+            fills, history = await asyncio.gather(
+                self._get_executions(symbol, order_id),
+                self._get_order_history(symbol, order_id),
+                return_exceptions=True,
+            )
+            if isinstance(fills, Exception):
+                logger.warning("Не удалось получить executions для ордера %s: %s", order_id, fills)
+            else:
+                exec_price = _fills_vwap(fills)
+                if exec_price > 0:
+                    return exec_price
+
+            if isinstance(history, Exception):
+                logger.warning("Не удалось получить историю ордера %s: %s", order_id, history)
+            elif history:
+                avg_price = history[0].get('avgPrice') or history[0].get('price')
+                try:
+                    history_price = float(avg_price or 0)
+                except (TypeError, ValueError):
+                    pass
+
+        return history_price
+
+    async def _get_top_of_book_price(self, symbol: str, side: str) -> float:
+        """Лучшая цена из тикера: для Buy -> ask1Price, для Sell -> bid1Price."""
+        ticker = await self.get_ticker(symbol)
+        try:
+            item = ticker['result']['list'][0]
+            p = item.get('ask1Price') if side.lower() == 'buy' else item.get('bid1Price')
+            return float(p) if p is not None and p != '' else None
+        except Exception:
+            return None
+
+    async def place_order(self, symbol: str, side: str, order_type: str, qty: float, price: float = None,
+                          reduce_only: bool = False) -> Dict[str, Any]:
+        """Размещение ордера (см. BybitClient.place_order). Возвращает результат с executedPrice."""
+        try:
+            logger.info("Попытка размещения ордера: %s %s %s по цене %s", side, qty, symbol, price)
+            # Фильтры инструмента запрашиваются синхронно один раз, дальше — из кеша
+            filters = await asyncio.to_thread(self._sync._get_symbol_filters, symbol)
+            qty_str = self._sync._quantize_qty_with(filters, qty)
+
+            if order_type == "Limit" and price is None:
+                logger.error("Для лимитного ордера должна быть указана цена")
+                return {}
+            if price is not None and price <= 0:
+                logger.error("Некорректная цена: %s", price)
+                return {}
+
+            tif = "IOC" if order_type.lower() == "market" else "GTC"
+            order_params = {
+                "category": "linear",
+                "symbol": symbol,
+                "side": side,
+                "orderType": order_type,
+                "qty": qty_str,
+                "timeInForce": tif,
+            }
+            if reduce_only:
+                order_params["reduceOnly"] = True
+            if price is not None:
+                order_params["price"] = self._sync._quantize_price_with(filters, price)
+
+            used_params = order_params
+            try:
+                response = await self._request('POST', '/v5/order/create', order_params, signed=True)
+            except BybitAPIError as e:
+                if e.status_code not in FALLBACK_CODES:
+                    raise
+                # 30208 -> лимит IOC по лучшей цене стакана
+                tob_price = await self._get_top_of_book_price(symbol, side)
+                if tob_price is None:
+                    logger.error("Fallback невозможен: нет лучшей цены стакана")
+                    raise
+                used_params = dict(order_params, orderType="Limit", timeInForce="IOC",
+                                   price=self._sync._quantize_price_with(filters, tob_price))
+                logger.info("Fallback %s -> Limit IOC @ %s", e.status_code, used_params['price'])
+                response = await self._request('POST', '/v5/order/create', used_params, signed=True)
+
+            result = response['result']
+            order_id = result.get('orderId')
+            exec_price = await self._get_executed_price(symbol, order_id)
+            enriched = dict(result)
+            if exec_price > 0:
+                enriched['executedPrice'] = exec_price
+            logger.info(
+                "ORDER: id=%s side=%s symbol=%s type=%s tif=%s qty=%s price=%s execPrice=%s",
+                order_id, side, symbol, used_params.get('orderType'), used_params.get('timeInForce'),
+                used_params.get('qty'), used_params.get('price', '-'), exec_price if exec_price > 0 else '-',
+            )
+            return enriched
+        except Exception as e:
+            logger.error("Ошибка при размещении ордера: %s", e)
+            return {}
+
+    async def close_all_longs(self, symbol: str) -> bool:
+        """Закрыть все длинные позиции по инструменту reduceOnly Market ордером."""
+        return await self._close_longs(symbol, await self.get_positions(symbol))
+
+    async def _close_longs(self, symbol: str, positions: List[dict]) -> bool:
+        try:
+            long_qty_total = _long_qty_total(positions)
+            if long_qty_total <= 0:
+                logger.info("Нет длинных позиций для закрытия по %s", symbol)
+                return True
+            logger.info("Закрываем long по %s: qty=%s", symbol, long_qty_total)
+            res = await self.place_order(symbol=symbol, side="Sell", order_type="Market",
+                                         qty=long_qty_total, reduce_only=True)
+            if not res:
+                logger.error("Не удалось отправить ордер на закрытие long по %s", symbol)
+            return bool(res)
+        except Exception as e:
+            logger.error("Ошибка при закрытии long по %s: %s", symbol, e)
+            return False
+
+    async def close_all(self, symbols: List[str]) -> Dict[str, bool]:
+        """Закрыть long по нескольким инструментам; позиции запрашиваются параллельно."""
+        positions = await asyncio.gather(*(self.get_positions(s) for s in symbols))
+        results = await asyncio.gather(*(
+            self._close_longs(symbol, pos) for symbol, pos in zip(symbols, positions)
+        ))
+        return dict(zip(symbols, results))
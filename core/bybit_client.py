@@ -1,34 +1,206 @@
 # core/bybit_client.py
-from pybit.unified_trading import HTTP
+from pybit.unified_trading import HTTP, WebSocket
+from pybit.exceptions import InvalidRequestError
+from requests.adapters import HTTPAdapter
+import asyncio
+import json
 import os
+import threading
 from dotenv import load_dotenv
 import logging
-from typing import Dict, Any, List  # Добавляем необходимые импорты
+import math
+import random
+from typing import Dict, Any, List, Optional, Tuple  # Добавляем необходимые импорты
 from datetime import datetime
 import time
 from decimal import Decimal, ROUND_DOWN
+import numpy as np
+import pandas as pd
 
-# Загрузка переменных окружения
-load_dotenv()
+from ._kernels import vwap
+
+try:
+    import orjson  # Быстрый разбор JSON-ответов, если установлен
+except ImportError:
+    orjson = None
+
+# Ключи API: .env загружается при создании первого клиента, а не при импорте модуля
+_CREDENTIALS: Optional[Tuple[str, str]] = None
 
 logger = logging.getLogger('bybit_client')
 
+KLINE_COLUMNS = ['open_time', 'open', 'high', 'low', 'close', 'volume']
+# Свечи как структурированный массив: open_time в мс (UTC), остальные поля float64
+KLINE_DTYPE = np.dtype([('open_time', 'i8'), ('open', 'f8'), ('high', 'f8'),
+                        ('low', 'f8'), ('close', 'f8'), ('volume', 'f8')])
+
+# Общая часть параметров запросов по линейным контрактам
+_LINEAR_PARAMS = {"category": "linear"}
+
+# Персистентный кеш фильтров инструментов: фильтры меняются редко, TTL — сутки
+FILTERS_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'bybit_bot', 'filters.json')
+FILTERS_CACHE_TTL = 86400.0
+_FILTER_KEYS = ('qty_step', 'min_qty', 'tick_size')
+# preload_filters пишет файл из нескольких потоков
+_FILTERS_FILE_LOCK = threading.Lock()
+
+# Шаги с большим числом знаков квантуются через Decimal
+_MAX_FAST_DECIMALS = 9
+
+# retCode отказа, после которого рыночный ордер повторяется лимитным IOC по лучшей цене стакана
+# (30208: цена рыночного ордера вне допустимого диапазона на тестнете)
+FALLBACK_CODES = frozenset({30208})
+
+# Таблица для str.translate: убирает emoji из сообщений об ошибках за один проход
+_EMOJI_TRANS = str.maketrans({'✅': '', '💰': '', '→': '->'})
+
+# Тикер из WebSocket считается устаревшим после этой паузы без сообщений — тогда идет REST-запрос
+WS_TICKER_STALE_AFTER = 2.0
+
+# Паузы между повторными запросами исполнений: обычно они видны сразу, поэтому первый повтор быстрый
+FILL_POLL_DELAYS = (0.05, 0.1, 0.2, 0.4, 0.8)
+FILL_POLL_JITTER = 0.02
+
+# Максимум записей в каждом TTL-кеше клиента (старейшие вытесняются)
+_CACHE_MAX_SIZE = 64
+
+
+def _get_credentials() -> Tuple[str, str]:
+    """(api_key, api_secret) из окружения/.env; читаются один раз за процесс."""
+    global _CREDENTIALS
+    if _CREDENTIALS is None:
+        load_dotenv()
+        _CREDENTIALS = (os.getenv('BYBIT_API_KEY'), os.getenv('BYBIT_API_SECRET'))
+    return _CREDENTIALS
+
+
+def _orjson_response_hook(response, *args, **kwargs):
+    """pybit разбирает ответы через response.json(); подменяем его на orjson.
+    orjson.JSONDecodeError — подкласс json.JSONDecodeError, обработка ошибок pybit не меняется.
+    """
+    content = response.content
+    response.json = lambda **_: orjson.loads(content)
+    return response
+
+
+def _step_decimals(*values: Decimal) -> Optional[int]:
+    """Число знаков после запятой, достаточное для точного представления values в целых единицах."""
+    decimals = max(max(-v.normalize().as_tuple().exponent, 0) for v in values)
+    return decimals if decimals <= _MAX_FAST_DECIMALS else None
+
+
+def _to_units(value: float, decimals: int) -> Optional[int]:
+    """Значение в целых единицах 10**-decimals с отбрасыванием лишних знаков (как Decimal(str(value)) //).
+    Разбирается кратчайшее десятичное представление float, поэтому 0.29 дает ровно 29 сотых.
+    None для экспоненциальной записи и inf/nan — тогда используется Decimal.
+    """
+    text = repr(float(value))
+    if 'e' in text or 'n' in text:
+        return None
+    int_part, _, frac = text.partition('.')
+    return int(int_part + (frac + '0' * decimals)[:decimals])
+
+
+def _format_units(units: int, decimals: int) -> str:
+    """Строка из целых единиц без экспоненты и лишних нулей (как _format_decimal)."""
+    if decimals == 0 or units == 0:
+        return str(units)
+    sign = '-' if units < 0 else ''
+    digits = str(abs(units)).rjust(decimals + 1, '0')
+    frac = digits[-decimals:].rstrip('0')
+    return f"{sign}{digits[:-decimals]}.{frac}" if frac else f"{sign}{digits[:-decimals]}"
+
+
+# В V5 long обычно side='Buy'
+_LONG_SIDES = frozenset({'buy', 'long'})
+
+
+def _to_float(value) -> float:
+    """float(value) или 0.0, если значение не разбирается (строка не число, неподходящий тип)."""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _long_qty_total(positions: List[dict]) -> float:
+    """Суммарный объем длинных позиций; '' и None в размере считаются нулем,
+    неразборчивые строки пропускаются (не прерывают закрытие остальных)."""
+    return sum(
+        _to_float(p.get('size') or p.get('qty') or p.get('positionQty') or 0)
+        for p in positions if (p.get('side') or '').lower() in _LONG_SIDES
+    )
+
+
+def _fills_vwap(fills: List[dict]) -> float:
+    """VWAP по списку исполнений (execQty/execPrice приходят строками); 0.0, если объема нет."""
+    n = len(fills)
+    qtys = np.fromiter((float(f.get('execQty') or 0) for f in fills), dtype=np.float64, count=n)
+    prices = np.fromiter((float(f.get('execPrice') or 0) for f in fills), dtype=np.float64, count=n)
+    return float(vwap(qtys, prices))
+
+
 class BybitClient:
-    def __init__(self, testnet=True):
+    # Общие HTTP-сессии pybit по (testnet, api_key): все клиенты процесса используют один пул соединений.
+    # Сессии не закрываются клиентами — только BybitClient.close_all() при завершении работы.
+    _session_registry: Dict[Tuple[bool, str], HTTP] = {}
+
+    @classmethod
+    def _get_session(cls, testnet: bool, api_key: str, api_secret: str) -> HTTP:
+        key = (testnet, api_key)
+        session = cls._session_registry.get(key)
+        if session is None:
+            session = HTTP(
+                testnet=testnet,
+                api_key=api_key,
+                api_secret=api_secret,
+            )
+            # Пул keep-alive соединений: параллельные запросы (snapshot_async, пул роботов) не открывают новые TLS-сессии
+            http_client = getattr(session, 'client', None)
+            if http_client is not None:
+                http_client.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=32))
+                if orjson is not None:
+                    http_client.hooks['response'].append(_orjson_response_hook)
+            cls._session_registry[key] = session
+        return session
+
+    @classmethod
+    def close_all(cls):
+        """Закрыть все общие HTTP-сессии (при завершении процесса)."""
+        for session in cls._session_registry.values():
+            http_client = getattr(session, 'client', None)
+            if http_client is not None:
+                http_client.close()
+        cls._session_registry.clear()
+
+    def __init__(self, testnet=True, ticker_ttl: float = 0.25, klines_ttl: float = 60.0,
+                 positions_ttl: float = 1.0, ticker_ttls: Dict[str, float] = None):
         self.testnet = testnet
-        self.api_key = os.getenv('BYBIT_API_KEY')
-        self.api_secret = os.getenv('BYBIT_API_SECRET')
+        self.api_key, self.api_secret = _get_credentials()
         
-        # Инициализация сессии
-        self.session = HTTP(
-            testnet=self.testnet,
-            api_key=self.api_key,
-            api_secret=self.api_secret,
-        )
+        # Инициализация сессии (общая для всех клиентов с тем же testnet и ключом)
+        self.session = self._get_session(self.testnet, self.api_key, self.api_secret)
 
         # Cache for instrument filters to avoid repetitive API calls
-        self._filters_cache: Dict[str, Dict[str, Any]] = {}
-        
+        self._filters_cache: Dict[str, Dict[str, Any]] = self._load_filters_cache()
+
+        # TTL-кеши рыночных данных: вся популяция в пределах TTL получает один ответ API
+        self.ticker_ttl = float(ticker_ttl)
+        self.klines_ttl = float(klines_ttl)
+        self.positions_ttl = float(positions_ttl)
+        # TTL тикера по отдельным символам (для более/менее волатильных инструментов)
+        self.ticker_ttls: Dict[str, float] = dict(ticker_ttls or {})
+        self._ticker_cache: Dict[str, Tuple[float, dict]] = {}
+        self._klines_cache: Dict[tuple, Tuple[float, np.ndarray]] = {}
+        self._positions_cache: Dict[str, Tuple[float, list]] = {}
+        # Кеши пишутся из потоков пула (снимок рынка, пакетная загрузка свечей): вытеснение — под замком
+        self._cache_lock = threading.Lock()
+
+        # Поток тикеров по WebSocket (см. subscribe_tickers): symbol -> (monotonic_ts, ответ в формате REST)
+        self._ws = None
+        self._ws_tickers: Dict[str, Tuple[float, dict]] = {}
+        self._ws_ticker_data: Dict[str, dict] = {}
+
         logger.info("BybitClient инициализирован")
     
     def get_account_balance(self):
@@ -41,30 +213,162 @@ class BybitClient:
                 return float(total_balance)
             return 0.0
         except Exception as e:
-            logger.error(f"Ошибка при получении баланса: {e}")
+            logger.error("Ошибка при получении баланса: %s", e)
             return 0.0
     
+    def _cache_get(self, cache: Dict[Any, Tuple[float, Any]], key, ttl: float):
+        """Значение из TTL-кеша или None, если его нет или оно устарело."""
+        with self._cache_lock:
+            entry = cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+        return None
+
+    def _cache_put(self, cache: Dict[Any, Tuple[float, Any]], key, value):
+        """Запись в TTL-кеш; при переполнении вытесняется самая старая запись."""
+        entry = (time.monotonic(), value)
+        with self._cache_lock:
+            # pop + вставка: порядок словаря совпадает с порядком записи
+            cache.pop(key, None)
+            cache[key] = entry
+            if len(cache) > _CACHE_MAX_SIZE:
+                cache.pop(next(iter(cache)), None)
+
+    def subscribe_tickers(self, symbols: List[str]):
+        """Подписка на тикеры по WebSocket: get_ticker отдает последнее сообщение без REST-запроса.
+        Если соединение не удалось, тикеры продолжают запрашиваться по REST; возвращает успех подписки."""
+        try:
+            if self._ws is None:
+                self._ws = WebSocket(testnet=self.testnet, channel_type="linear")
+            for symbol in symbols:
+                self._ws.ticker_stream(symbol=symbol, callback=self._on_ticker)
+            return True
+        except Exception as e:
+            logger.warning("WebSocket тикеров недоступен, используем REST: %s", e)
+            return False
+
+    def _on_ticker(self, message: dict):
+        """Колбэк потока тикеров (поток WebSocket). snapshot заменяет данные, delta содержит только изменения."""
+        data = message.get('data') or {}
+        symbol = data.get('symbol')
+        if not symbol:
+            return
+        if message.get('type') == 'snapshot' or symbol not in self._ws_ticker_data:
+            item = dict(data)
+        else:
+            item = {**self._ws_ticker_data[symbol], **data}
+        self._ws_ticker_data[symbol] = item
+        # Тот же формат, что у REST get_tickers; новый словарь на каждое сообщение — читатели не видят частичных обновлений
+        response = {'retCode': 0, 'result': {'category': 'linear', 'list': [item]}}
+        self._ws_tickers[symbol] = (time.monotonic(), response)
+
     def get_ticker(self, symbol):
-        """Получение информации о тикере"""
+        """Получение информации о тикере: из WebSocket-потока, если он свежий, иначе REST с кешем на ticker_ttl секунд"""
+        streamed = self._cache_get(self._ws_tickers, symbol, WS_TICKER_STALE_AFTER)
+        if streamed is not None:
+            return streamed
+        cached = self._cache_get(self._ticker_cache, symbol, self.ticker_ttls.get(symbol, self.ticker_ttl))
+        if cached is not None:
+            return cached
         try:
             response = self.session.get_tickers(
                 category="linear",
                 symbol=symbol
             )
-            # Убрали шумный вывод сырого тикера
+            # Сырой ответ только в debug: форматирование словаря не выполняется, если уровень выключен
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Raw ticker response: %s", response)
             if (response and 'result' in response and 
                 'list' in response['result'] and 
                 response['result']['list']):
+                self._cache_put(self._ticker_cache, symbol, response)
                 return response
             return None
         except Exception as e:
-            logger.error(f"Ошибка при получении тикера: {e}")
+            logger.error("Ошибка при получении тикера: %s", e)
             return None
 
+    async def snapshot_async(self, symbol: str) -> Dict[str, Any]:
+        """Параллельно получить тикер, баланс и позиции (одна задержка сети вместо трех)."""
+        ticker, balance, positions = await asyncio.gather(
+            asyncio.to_thread(self.get_ticker, symbol),
+            asyncio.to_thread(self.get_account_balance),
+            asyncio.to_thread(self.get_positions, symbol),
+        )
+        return {'ticker': ticker, 'balance': balance, 'positions': positions}
+
+    def snapshot(self, symbol: str) -> Dict[str, Any]:
+        """Синхронная обертка над snapshot_async"""
+        return asyncio.run(self.snapshot_async(symbol))
+
+    async def get_klines_bulk_async(self, pairs: List[Tuple[str, str]], limit: int = 100) -> Dict[Tuple[str, str], pd.DataFrame]:
+        """Параллельная загрузка свечей для нескольких пар (symbol, interval)."""
+        results = await asyncio.gather(
+            *(asyncio.to_thread(self.get_klines, symbol, interval, limit) for symbol, interval in pairs)
+        )
+        return dict(zip(pairs, results))
+
+    def get_klines_bulk(self, pairs: List[Tuple[str, str]], limit: int = 100) -> Dict[Tuple[str, str], pd.DataFrame]:
+        """Синхронная обертка над get_klines_bulk_async"""
+        return asyncio.run(self.get_klines_bulk_async(pairs, limit))
+
+    @staticmethod
+    def _make_filters(qty_step: Decimal, min_qty: Decimal, tick_size: Decimal, ts: float = None) -> Dict[str, Any]:
+        """Словарь фильтров инструмента с предрасчитанными целыми шагами для быстрого квантования."""
+        filters = {'qty_step': qty_step, 'min_qty': min_qty, 'tick_size': tick_size}
+        if ts is not None:
+            filters['ts'] = ts
+        qty_decimals = _step_decimals(qty_step, min_qty)
+        if qty_decimals is not None and qty_step > 0:
+            scale = 10 ** qty_decimals
+            filters['qty_fast'] = (qty_decimals, int(qty_step * scale), int(min_qty * scale))
+        price_decimals = _step_decimals(tick_size)
+        if price_decimals is not None and tick_size > 0:
+            scale = 10 ** price_decimals
+            filters['price_fast'] = (price_decimals, int(tick_size * scale))
+        return filters
+
+    @staticmethod
+    def _load_filters_cache() -> Dict[str, Dict[str, Any]]:
+        """Загрузить фильтры инструментов с диска (значения — Decimal, плюс 'ts' записи)."""
+        try:
+            with open(FILTERS_CACHE_PATH, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            return {
+                symbol: BybitClient._make_filters(*(Decimal(entry[k]) for k in _FILTER_KEYS), ts=float(entry['ts']))
+                for symbol, entry in raw.items()
+            }
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning("Не удалось прочитать кеш фильтров %s: %s", FILTERS_CACHE_PATH, e)
+            return {}
+
+    def _save_filters_cache(self):
+        """Сохранить полученные с биржи фильтры на диск (атомарная замена файла)."""
+        raw = {
+            symbol: {**{k: str(f[k]) for k in _FILTER_KEYS}, 'ts': f['ts']}
+            for symbol, f in list(self._filters_cache.items()) if 'ts' in f
+        }
+        try:
+            os.makedirs(os.path.dirname(FILTERS_CACHE_PATH), exist_ok=True)
+            # PID в имени: процессы не перезаписывают чужой временный файл (внутри процесса — замок)
+            tmp_path = f"{FILTERS_CACHE_PATH}.{os.getpid()}.tmp"
+            with _FILTERS_FILE_LOCK:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(raw, f)
+                os.replace(tmp_path, FILTERS_CACHE_PATH)
+        except Exception as e:
+            logger.warning("Не удалось сохранить кеш фильтров %s: %s", FILTERS_CACHE_PATH, e)
+
     def _get_symbol_filters(self, symbol: str) -> Dict[str, Decimal]:
-        """Получить фильтры инструмента (шаг и минимум для количества и цены) и кешировать их."""
-        if symbol in self._filters_cache:
-            return self._filters_cache[symbol]
+        """Получить фильтры инструмента (шаг и минимум для количества и цены) и кешировать их.
+        Полученные с биржи фильтры хранятся на диске FILTERS_CACHE_TTL секунд.
+        """
+        cached = self._filters_cache.get(symbol)
+        # Записи без 'ts' — значения по умолчанию после ошибки, живут до конца процесса
+        if cached is not None and time.time() - cached.get('ts', time.time()) < FILTERS_CACHE_TTL:
+            return cached
         try:
             info = self.session.get_instruments_info(category="linear", symbol=symbol)
             item = None
@@ -78,16 +382,31 @@ class BybitClient:
             min_qty = Decimal(str(lot.get('minOrderQty', '1')))
             tick_size = Decimal(str(price_filter.get('tickSize', '0.01')))
         except Exception as e:
-            logger.warning(f"Не удалось получить фильтры инструмента {symbol}: {e}")
+            logger.warning("Не удалось получить фильтры инструмента %s: %s", symbol, e)
+            if cached is not None:
+                # Устаревшие фильтры биржи лучше значений по умолчанию
+                return cached
             defaults = {
                 'BTCUSDT': (Decimal('0.001'), Decimal('0.001'), Decimal('0.1')),
                 'DOGEUSDT': (Decimal('1'), Decimal('100'), Decimal('0.0001')),
             }
             qty_step, min_qty, tick_size = defaults.get(symbol, (Decimal('1'), Decimal('1'), Decimal('0.01')))
-        filters = {'qty_step': qty_step, 'min_qty': min_qty, 'tick_size': tick_size}
+            filters = self._make_filters(qty_step, min_qty, tick_size)
+            self._filters_cache[symbol] = filters
+            return filters
+        filters = self._make_filters(qty_step, min_qty, tick_size, ts=time.time())
         self._filters_cache[symbol] = filters
+        self._save_filters_cache()
         return filters
 
+    async def preload_filters_async(self, symbols: List[str]):
+        """Параллельно загрузить фильтры инструментов, чтобы первый ордер не ждал get_instruments_info."""
+        await asyncio.gather(*(asyncio.to_thread(self._get_symbol_filters, s) for s in symbols))
+
+    def preload_filters(self, symbols: List[str]):
+        """Синхронная обертка над preload_filters_async"""
+        asyncio.run(self.preload_filters_async(symbols))
+
     def _format_decimal(self, value: Decimal) -> str:
         """Форматировать Decimal без экспоненты и лишних нулей."""
         s = format(value.normalize(), 'f')
@@ -104,7 +423,16 @@ class BybitClient:
         return (value // step) * step
 
     def _quantize_qty(self, symbol: str, qty: float) -> str:
-        filters = self._get_symbol_filters(symbol)
+        return self._quantize_qty_with(self._get_symbol_filters(symbol), qty)
+
+    def _quantize_qty_with(self, filters: Dict[str, Any], qty: float) -> str:
+        """Квантование объема по уже полученным фильтрам инструмента."""
+        fast = filters.get('qty_fast')
+        if fast is not None:
+            decimals, step_units, min_units = fast
+            units = _to_units(qty, decimals)
+            if units is not None:
+                return _format_units(max(units // step_units * step_units, min_units), decimals)
         step = filters['qty_step']
         min_qty = filters['min_qty']
         q = Decimal(str(qty))
@@ -114,7 +442,16 @@ class BybitClient:
         return self._format_decimal(quantized)
 
     def _quantize_price(self, symbol: str, price: float) -> str:
-        filters = self._get_symbol_filters(symbol)
+        return self._quantize_price_with(self._get_symbol_filters(symbol), price)
+
+    def _quantize_price_with(self, filters: Dict[str, Any], price: float) -> str:
+        """Квантование цены по уже полученным фильтрам инструмента."""
+        fast = filters.get('price_fast')
+        if fast is not None:
+            decimals, tick_units = fast
+            units = _to_units(price, decimals)
+            if units is not None:
+                return _format_units(units // tick_units * tick_units, decimals)
         ts = filters['tick_size']
         p = Decimal(str(price))
         quantized = self._quantize_to_step(p, ts)
@@ -135,28 +472,74 @@ class BybitClient:
             pass
         return None
     
-    def get_klines(self, symbol, interval, limit=100, start: int = None, end: int = None):
-        """Получение исторических данных (свечей).
-        start и end в миллисекундах (UTC). Если не заданы — вернутся последние свечи.
+    @staticmethod
+    def _klines_to_array(rows: List[list]) -> np.ndarray:
+        """Разбор строк свечей Bybit в структурированный массив KLINE_DTYPE (по возрастанию времени).
+        Строки приходят как [startTime, open, high, low, close, volume, turnover], от новых к старым.
+        """
+        arr = np.empty(len(rows), dtype=KLINE_DTYPE)
+        if not rows:
+            return arr
+        raw = np.asarray(rows, dtype=np.float64)[::-1]
+        arr['open_time'] = raw[:, 0]
+        for i, name in enumerate(KLINE_COLUMNS[1:], start=1):
+            arr[name] = raw[:, i]
+        return arr
+
+    @staticmethod
+    def _array_to_frame(arr: np.ndarray) -> pd.DataFrame:
+        """DataFrame со столбцами OHLCV из массива KLINE_DTYPE."""
+        if arr.size == 0:
+            return pd.DataFrame(columns=KLINE_COLUMNS)
+        frame = {name: arr[name] for name in KLINE_COLUMNS[1:]}
+        return pd.DataFrame({'open_time': pd.to_datetime(arr['open_time'], unit='ms'), **frame})
+
+    @staticmethod
+    def _klines_to_frame(rows: List[list]) -> pd.DataFrame:
+        """Разбор строк свечей Bybit в DataFrame со столбцами OHLCV (по возрастанию времени)."""
+        return BybitClient._array_to_frame(BybitClient._klines_to_array(rows))
+
+    def get_klines_np(self, symbol, interval, limit=100, start: int = None, end: int = None) -> np.ndarray:
+        """Свечи как структурированный массив KLINE_DTYPE по возрастанию времени
+        (столбцы — arr['close'] и т.д. — готовы для векторных и numba-индикаторов).
+        start и end в миллисекундах (UTC). Ответы кешируются на klines_ttl секунд;
+        возвращаемый массив общий — не изменяйте его.
         """
+        cache_key = (symbol, interval, limit, start, end)
+        cached = self._cache_get(self._klines_cache, cache_key, self.klines_ttl)
+        if cached is not None:
+            return cached
         try:
-            params = dict(category="linear", symbol=symbol, interval=interval, limit=limit)
+            params = _LINEAR_PARAMS | {"symbol": symbol, "interval": interval, "limit": limit}
             if start is not None:
                 params["start"] = int(start)
             if end is not None:
                 params["end"] = int(end)
             response = self.session.get_kline(**params)
             if response and 'result' in response:
-                return response['result']['list']
-            return []
+                klines = self._klines_to_array(response['result']['list'])
+                if klines.size:
+                    self._cache_put(self._klines_cache, cache_key, klines)
+                return klines
         except Exception as e:
-            logger.error(f"Ошибка при получении свечей: {e}")
-            return []
-    
-    def _get_executed_price(self, symbol: str, order_id: str, retries: int = 5, delay: float = 0.3) -> float:
-        """Получение средней цены исполнения ордера по orderId (VWAP по исполненным сделкам)."""
+            logger.error("Ошибка при получении свечей: %s", e)
+        return np.empty(0, dtype=KLINE_DTYPE)
+
+    def get_klines(self, symbol, interval, limit=100, start: int = None, end: int = None) -> pd.DataFrame:
+        """Получение исторических данных (свечей) в виде DataFrame
+        (open_time, open, high, low, close, volume) по возрастанию времени.
+        start и end в миллисекундах (UTC). Если не заданы — вернутся последние свечи.
+        """
+        return self._array_to_frame(self.get_klines_np(symbol, interval, limit, start, end))
+
+    def _get_executed_price(self, symbol: str, order_id: str, delays=FILL_POLL_DELAYS) -> float:
+        """Получение средней цены исполнения ордера по orderId (VWAP по исполненным сделкам).
+        Повторы с экспоненциальной паузой из delays и небольшим случайным джиттером.
+        """
         try:
-            for _ in range(retries):
+            for attempt in range(len(delays) + 1):
+                if attempt:
+                    time.sleep(delays[attempt - 1] + random.random() * FILL_POLL_JITTER)
                 # Пытаемся получить список исполнений
                 execs = self.session.get_executions(
                     category="linear",
@@ -164,20 +547,11 @@ class BybitClient:
                     orderId=order_id
                 )
                 if execs and 'result' in execs and execs['result'].get('list'):
-                    fills: List[dict] = execs['result']['list']
-                    total_qty = 0.0
-                    total_notional = 0.0
-                    for fill in fills:
-                        # execQty и execPrice приходят строками
-                        qty = float(fill.get('execQty', 0) or 0)
-                        price = float(fill.get('execPrice', 0) or 0)
-                        total_qty += qty
-                        total_notional += qty * price
-                    if total_qty > 0:
-                        return total_notional / total_qty
-                time.sleep(delay)
+                    exec_price = _fills_vwap(execs['result']['list'])
+                    if exec_price > 0:
+                        return exec_price
         except Exception as e:
-            logger.warning(f"Не удалось получить executions для ордера {order_id}: {e}")
+            logger.warning("Не удалось получить executions для ордера %s: %s", order_id, e)
         
         # Фолбэк: пытаемся взять из истории ордеров (avgPrice)
         try:
@@ -192,7 +566,7 @@ class BybitClient:
                 if avg_price is not None:
                     return float(avg_price)
         except Exception as e:
-            logger.warning(f"Не удалось получить историю ордера {order_id}: {e}")
+            logger.warning("Не удалось получить историю ордера %s: %s", order_id, e)
         
         return 0.0
     
@@ -203,13 +577,16 @@ class BybitClient:
         """
         try:
             # Добавим логирование перед размещением
-            logger.info(f"Попытка размещения ордера: {side} {qty} {symbol} по цене {price}")
+            logger.info("Попытка размещения ордера: %s %s %s по цене %s", side, qty, symbol, price)
             # Корректируем объем под биржевые ограничения (minQty, qtyStep)
-            q_before = Decimal(str(qty))
-            qty_str = self._quantize_qty(symbol, qty)
-            q_after = Decimal(qty_str)
-            if q_after != q_before:
-                logger.info(f"Корректировка объема: {q_before} -> {qty_str} по правилам биржи")
+            # Фильтры один раз на ордер: объем, цена и fallback используют одни и те же
+            filters = self._get_symbol_filters(symbol)
+            qty_str = self._quantize_qty_with(filters, qty)
+            # Сравнение через Decimal только ради сообщения — пропускается, если INFO выключен
+            if logger.isEnabledFor(logging.INFO):
+                q_before = Decimal(str(qty))
+                if Decimal(qty_str) != q_before:
+                    logger.info("Корректировка объема: %s -> %s по правилам биржи", q_before, qty_str)
 
             # Проверяем, что цена указана для лимитных ордеров
             if order_type == "Limit" and price is None:
@@ -218,7 +595,7 @@ class BybitClient:
             
             # Проверяем, что цена положительная
             if price is not None and price <= 0:
-                logger.error(f"Некорректная цена: {price}")
+                logger.error("Некорректная цена: %s", price)
                 return {}
             
             # Базовые параметры
@@ -237,14 +614,14 @@ class BybitClient:
             
             if price is not None:
                 # Приводим цену к шагу цены при необходимости (для Limit)
-                order_params["price"] = self._quantize_price(symbol, price)
+                order_params["price"] = self._quantize_price_with(filters, price)
                 
             used_params = order_params
             try:
                 response = self.session.place_order(**order_params)
-            except Exception as e:
-                # Проверка на 30208 -> fallback
-                if "30208" in str(e):
+            except InvalidRequestError as e:
+                # retCode приходит в status_code: 30208 -> fallback
+                if e.status_code in FALLBACK_CODES:
                     tob_price = self._get_top_of_book_price(symbol, side)
                     if tob_price is None:
                         logger.error("Fallback невозможен: нет лучшей цены стакана")
@@ -252,33 +629,36 @@ class BybitClient:
                     order_params_fallback = dict(order_params)
                     order_params_fallback.update({
                         "orderType": "Limit",
-                        "price": self._quantize_price(symbol, tob_price),
+                        "price": self._quantize_price_with(filters, tob_price),
                         "timeInForce": "IOC",
                     })
                     if reduce_only:
                         order_params_fallback["reduceOnly"] = True
                     used_params = order_params_fallback
-                    logger.info(f"Fallback 30208 -> Limit IOC @ {order_params_fallback['price']}")
+                    logger.info("Fallback %s -> Limit IOC @ %s", e.status_code, order_params_fallback['price'])
                     response = self.session.place_order(**order_params_fallback)
                 else:
                     # Короткое сообщение об ошибке заказа (без не-ASCII символов)
-                    safe_msg = str(e).replace('✅', '').replace('💰', '').replace('→', '->')
-                    logger.error(f"Ошибка размещения ордера: {safe_msg[:200]}")
+                    if logger.isEnabledFor(logging.ERROR):
+                        logger.error("Ошибка размещения ордера: %s", str(e)[:200].translate(_EMOJI_TRANS))
                     raise
             
             if response and 'result' in response:
+                # Позиции по символу изменились — кеш больше не актуален
+                with self._cache_lock:
+                    self._positions_cache.pop(symbol, None)
                 result = response['result']
                 order_id = result.get('orderId')
                 # Для рыночного ордера или лимит-IOC fallback получаем фактическую цену исполнения
                 exec_price = self._get_executed_price(symbol, order_id)
                 executed_price = exec_price if exec_price > 0 else None
                 
-                # Короткое сводное сообщение об ордере
-                summary_price = used_params.get("price") if isinstance(used_params.get("price"), str) else str(used_params.get("price", ""))
+                # Короткое сводное сообщение об ордере (аргументы форматируются только при включенном INFO)
                 logger.info(
-                    f"ORDER: id={order_id} side={side} symbol={symbol} type={used_params.get('orderType')} "
-                    f"tif={used_params.get('timeInForce')} qty={used_params.get('qty')} price={summary_price or '-'} "
-                    f"execPrice={executed_price if executed_price is not None else '-'}"
+                    "ORDER: id=%s side=%s symbol=%s type=%s tif=%s qty=%s price=%s execPrice=%s",
+                    order_id, side, symbol, used_params.get('orderType'), used_params.get('timeInForce'),
+                    used_params.get('qty'), used_params.get('price') or '-',
+                    executed_price if executed_price is not None else '-',
                 )
                 
                 # Возвращаем расширенный результат
@@ -289,8 +669,8 @@ class BybitClient:
             return {}
         except Exception as e:
             # Убираем emoji из сообщения об ошибке для избежания проблем с кодировкой
-            error_msg = str(e).replace('✅', '').replace('💰', '').replace('→', '->')
-            logger.error(f"Ошибка при размещении ордера: {error_msg}")
+            if logger.isEnabledFor(logging.ERROR):
+                logger.error("Ошибка при размещении ордера: %s", str(e).translate(_EMOJI_TRANS))
             return {}
     
     def get_open_orders(self, symbol):
@@ -304,7 +684,7 @@ class BybitClient:
                 return response['result']['list']
             return []
         except Exception as e:
-            logger.error(f"Ошибка при получении ордеров: {e}")
+            logger.error("Ошибка при получении ордеров: %s", e)
             return []
     
     def cancel_order(self, symbol, order_id):
@@ -316,25 +696,30 @@ class BybitClient:
                 orderId=order_id
             )
             if response and 'result' in response:
-                logger.info(f"Ордер отменен: {response['result']}")
+                logger.info("Ордер отменен: %s", response['result'])
                 return response['result']
             return None
         except Exception as e:
-            logger.error(f"Ошибка при отмене ордера: {e}")
+            logger.error("Ошибка при отмене ордера: %s", e)
             return None
     
     def get_positions(self, symbol):
-        """Получение информации о позициях"""
+        """Получение информации о позициях (с кешем на positions_ttl секунд)"""
+        cached = self._cache_get(self._positions_cache, symbol, self.positions_ttl)
+        if cached is not None:
+            return cached
         try:
             response = self.session.get_positions(
                 category="linear",
                 symbol=symbol
             )
             if response and 'result' in response:
-                return response['result']['list']
+                positions = response['result']['list']
+                self._cache_put(self._positions_cache, symbol, positions)
+                return positions
             return []
         except Exception as e:
-            logger.error(f"Ошибка при получении позиций: {e}")
+            logger.error("Ошибка при получении позиций: %s", e)
             return []
 
     def close_all_longs(self, symbol: str) -> bool:
@@ -342,23 +727,13 @@ class BybitClient:
         Возвращает True, если позиций нет или ордер отправлен успешно.
         """
         try:
-            positions = self.get_positions(symbol)
-            long_qty_total = 0.0
-            for p in positions:
-                side = (p.get('side') or '').lower()
-                # В V5 long обычно side='Buy'
-                if side == 'buy' or side == 'long':
-                    size = p.get('size') or p.get('qty') or p.get('positionQty') or 0
-                    try:
-                        long_qty_total += float(size)
-                    except Exception:
-                        pass
+            long_qty_total = _long_qty_total(self.get_positions(symbol))
             if long_qty_total <= 0:
-                logger.info(f"Нет длинных позиций для закрытия по {symbol}")
+                logger.info("Нет длинных позиций для закрытия по %s", symbol)
                 return True
 
             # Отправляем reduceOnly Market Sell на весь объем
-            logger.info(f"Закрываем long по {symbol}: qty={long_qty_total}")
+            logger.info("Закрываем long по %s: qty=%s", symbol, long_qty_total)
             res = self.place_order(
                 symbol=symbol,
                 side="Sell",
@@ -368,12 +743,12 @@ class BybitClient:
             )
             ok = bool(res)
             if ok:
-                logger.info(f"Запрос на закрытие long по {symbol} отправлен: {res.get('orderId', '-')}")
+                logger.info("Запрос на закрытие long по %s отправлен: %s", symbol, res.get('orderId', '-'))
             else:
-                logger.error(f"Не удалось отправить ордер на закрытие long по {symbol}")
+                logger.error("Не удалось отправить ордер на закрытие long по %s", symbol)
             return ok
         except Exception as e:
-            logger.error(f"Ошибка при закрытии long по {symbol}: {e}")
+            logger.error("Ошибка при закрытии long по %s: %s", symbol, e)
             return False
     
     def get_api_key_info(self):
@@ -384,11 +759,11 @@ class BybitClient:
                 return response['result']
             return None
         except Exception as e:
-            logger.error(f"Ошибка при получении информации о API ключе: {e}")
+            logger.error("Ошибка при получении информации о API ключе: %s", e)
             return None
             
         except Exception as e:
-            logger.error(f"Ошибка при получении рыночных данных: {e}")
+            logger.error("Ошибка при получении рыночных данных: %s", e)
             # Возвращаем тестовые данные
             return {
                 'current_price': 50000.0 + (self.generation * 100),
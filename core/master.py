@@ -1,5 +1,8 @@
+import asyncio
 import time
 import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Dict, Any
 from analysis.metrics import AdvancedMetrics
@@ -7,12 +10,27 @@ import numpy as np
 from .worker import Robot
 from .strategies import SimpleStrategy
 from .bybit_client import BybitClient
-from evolution.genes import mutate, crossover
-from evolution.selection import select_parents
+from evolution.genes import mutate_population, crossover_population
+from evolution.population import Population
+from evolution.selection import select_parent_indices
 from utils.logger import setup_logger
 
+try:
+    import orjson  # Быстрая сериализация истории поколений, если установлен
+except ImportError:
+    orjson = None
+
 logger = setup_logger('evolution_manager')
 
+# Порядок строк матрицы метрик в evaluate_generation (ключи config['fitness_weights'])
+FITNESS_COMPONENTS = ('profit', 'sharpe_ratio', 'max_drawdown', 'profit_factor', 'win_rate', 'consistency')
+
+# История поколений: одна компактная JSON-строка на поколение
+HISTORY_PATH = 'data/generations.jsonl'
+
+# Сколько лучших роботов нужно упорядочить после оценки (элита и пул родителей create_new_generation)
+TOP_K = 10
+
 class EvolutionManager:
     def __init__(self, config: Dict[str, Any], client: BybitClient):
         self.config = config
@@ -26,13 +44,49 @@ class EvolutionManager:
 
         # Инициализация стратегии
         self.strategy = SimpleStrategy(self.client)
+
+        # SoA-представление популяции (для визуализации без обхода роботов)
+        capacity = int(self.config['population_size'])
+        self._profits = np.zeros(capacity, dtype=np.float64)
+        self._cycles = np.zeros(capacity, dtype=np.int64)
+        self._children = np.zeros(capacity, dtype=np.int64)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._n = 0
+
+        # Фитнес по поколениям в виде массивов (для графиков без обхода history)
+        self._best_fit_arr = np.full(64, np.nan, dtype=np.float64)
+        self._avg_fit_arr = np.full(64, np.nan, dtype=np.float64)
+        self._gen_n = 0
+
+        # Пауза между торговыми минутами: в режиме backtest не ждем независимо от tick_sleep_seconds
+        if self.config.get('mode') == 'backtest':
+            self._tick_sleep = 0.0
+        else:
+            self._tick_sleep = float(self.config.get('tick_sleep_seconds', 5.0))
+
+        self._rng = np.random.default_rng(self.config.get('seed'))  # seed из конфига — воспроизводимый прогон
+
+        # Файл истории поколений открывается при первой записи и остается открытым до save_final_results
+        self._hist_fh = None
+
+        # Пул потоков для торговли роботов: каждый шаг — сетевой запрос, роботы независимы
+        self._pool = ThreadPoolExecutor(max_workers=min(32, capacity), thread_name_prefix='robot')
+
+        # Асинхронная торговля (config['async_trading']): все ордера минуты — корутины в одном
+        # цикле событий, HTTP-соединения BybitAsyncClient общие для всех поколений
+        self._loop = None
+        self._async_client = None
+        if self.config.get('async_trading', False):
+            from .bybit_async_client import BybitAsyncClient  # httpx нужен только в этом режиме
+            self._loop = asyncio.new_event_loop()
+            self._async_client = BybitAsyncClient(testnet=self.config.get('testnet', True))
         
         # Создание начальной популяции
         self.create_initial_population()
         
     def create_initial_population(self):
         """Создание начальной популяции роботов"""
-        logger.info(f"Создание начальной популяции из {self.config['population_size']} роботов")
+        logger.info("Создание начальной популяции из %s роботов", self.config['population_size'])
         
         for i in range(self.config['population_size']):
             robot = Robot(
@@ -44,16 +98,68 @@ class EvolutionManager:
             )
             self.population.append(robot)
             
+        self._refresh_population_arrays()
         logger.info("Начальная популяция создана")
+
+    @property
+    def profits(self) -> np.ndarray:
+        return self._profits[:self._n]
+
+    @property
+    def cycles(self) -> np.ndarray:
+        return self._cycles[:self._n]
+
+    @property
+    def children(self) -> np.ndarray:
+        return self._children[:self._n]
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self._n]
+
+    @property
+    def best_fitness_history(self) -> np.ndarray:
+        return self._best_fit_arr[:self._gen_n]
+
+    @property
+    def avg_fitness_history(self) -> np.ndarray:
+        return self._avg_fit_arr[:self._gen_n]
+
+    def _refresh_population_arrays(self):
+        """Переписать SoA-массивы из текущей популяции (при смене состава)."""
+        n = len(self.population)
+        if n > self._profits.size:
+            # Расширяем буферы с запасом
+            capacity = max(n, 2 * self._profits.size)
+            self._profits = np.zeros(capacity, dtype=np.float64)
+            self._cycles = np.zeros(capacity, dtype=np.int64)
+            self._children = np.zeros(capacity, dtype=np.int64)
+            self._ids = np.zeros(capacity, dtype=np.int64)
+        for i, robot in enumerate(self.population):
+            self._profits[i] = robot.current_profit
+            self._cycles[i] = robot.survived_cycles
+            self._children[i] = robot.children_count
+            self._ids[i] = robot.robot_id
+        self._n = n
+
+    def _record_generation_fitness(self, best_fitness: float, avg_fitness: float):
+        """Дописать фитнес поколения в массивы истории (емкость удваивается при заполнении)."""
+        if self._gen_n >= self._best_fit_arr.size:
+            grow = self._best_fit_arr.size
+            self._best_fit_arr = np.concatenate([self._best_fit_arr, np.full(grow, np.nan)])
+            self._avg_fit_arr = np.concatenate([self._avg_fit_arr, np.full(grow, np.nan)])
+        self._best_fit_arr[self._gen_n] = best_fitness
+        self._avg_fit_arr[self._gen_n] = avg_fitness
+        self._gen_n += 1
     
     def _generate_random_gene(self) -> Dict[str, Any]:
         """Генерация случайного гена для робота"""
         return {
             'strategy_type': 'decision_tree',
             'decision_tree': self._generate_random_decision_tree(),
-            'trade_percentage': np.random.uniform(0.01, 0.1),  # Случайный % от баланса
-            'risk_appetite': np.random.uniform(0.1, 0.9),     # Уровень склонности к риску
-            'max_trade_duration': np.random.randint(1, 10)    # Макс. длительность сделки в минутах
+            'trade_percentage': self._rng.uniform(0.01, 0.1),  # Случайный % от баланса
+            'risk_appetite': self._rng.uniform(0.1, 0.9),     # Уровень склонности к риску
+            'max_trade_duration': int(self._rng.integers(1, 10))  # Макс. длительность сделки в минутах
         }
     
     def _generate_random_decision_tree(self) -> List[Dict[str, Any]]:
@@ -68,8 +174,10 @@ class EvolutionManager:
         ]
         
         # Выбираем случайное подмножество условий
-        num_conditions = np.random.randint(2, len(conditions))
-        return list(np.random.choice(conditions, num_conditions, replace=False))
+        num_conditions = int(self._rng.integers(2, len(conditions)))
+        # Выбираем индексы, а не сами словари: без преобразования списка в object-массив
+        idx = self._rng.choice(len(conditions), num_conditions, replace=False)
+        return [conditions[i] for i in idx]
     
     def _ensure_all_positions_closed(self, symbol: str, timeout_sec: int = 60) -> bool:
         """Гарантированно закрывает все длинные позиции на бирже и ждет подтверждения.
@@ -93,33 +201,43 @@ class EvolutionManager:
                 if long_qty <= 0:
                     logger.info("Все длинные позиции закрыты")
                     return True
-                logger.info(f"Ожидаем закрытия позиций: осталось long={long_qty}")
+                logger.info("Ожидаем закрытия позиций: осталось long=%s", long_qty)
                 time.sleep(1)
         except Exception as e:
-            logger.error(f"Ошибка ожидания закрытия позиций: {e}")
+            logger.error("Ошибка ожидания закрытия позиций: %s", e)
         return False
 
     def run_generation(self):
         """Запуск одного поколения (торгового цикла)"""
-        logger.info(f"Запуск поколения {self.generation}")
+        logger.info("Запуск поколения %s", self.generation)
         start_time = datetime.now()
         
+        # Решения всех роботов на все минуты поколения — одним вызовом генератора
+        minutes = self.config['generation_duration_minutes']
+        decisions = self.strategy.draw_decisions(self._rng, (len(self.population), minutes))
+
         # Запуск торговли для всех роботов
-        for minute in range(self.config['generation_duration_minutes']):
-            logger.info(f"Минута {minute + 1} из {self.config['generation_duration_minutes']}")
+        for minute in range(minutes):
+            logger.info("Минута %s из %s", minute + 1, minutes)
             
             # Получение текущих рыночных данных
             market_data = self.get_market_data()
-            
-            for robot in self.population:
-                # Каждый робот принимает торговое решение
-                robot.trade(self.config['symbol'], market_data)
-                
-                # Обновляем информацию о прибыли
-                robot.update_profit(market_data['current_price'])
+
+            # Роботы торгуют параллельно (пул потоков или корутины в цикле событий)
+            if self._async_client is not None:
+                self._loop.run_until_complete(
+                    self._trade_population_async(market_data, decisions[:, minute]))
+            else:
+                # list() дожидается завершения всех задач пула
+                list(self._pool.map(
+                    lambda robot, decision: self._trade_robot(robot, market_data, decision),
+                    self.population, decisions[:, minute],
+                ))
+            self._mark_to_market(market_data['current_price'])
             
             # Пауза между минутами (в реальной торговле нужно использовать точное время)
-            time.sleep(5)  # Для теста используем 1 секунду вместо 1 минуты
+            if self._tick_sleep:
+                time.sleep(self._tick_sleep)
         
         logger.info("Принудительное закрытие всех открытых позиций...")
         for robot in self.population:
@@ -140,9 +258,36 @@ class EvolutionManager:
         # Сохранение истории
         self.save_generation_history(start_time)
         
-        logger.info(f"Поколение {self.generation} завершено")
+        logger.info("Поколение %s завершено", self.generation)
         self.generation += 1
     
+    def _trade_robot(self, robot: Robot, market_data: Dict[str, Any], decision: str = None) -> bool:
+        """Торговое решение робота (выполняется в пуле потоков)."""
+        return robot.trade(self.config['symbol'], market_data, decision)
+
+    async def _trade_population_async(self, market_data: Dict[str, Any], decisions):
+        """Торговая минута всей популяции через BybitAsyncClient: ордера отправляются конкурентно."""
+        symbol = self.config['symbol']
+        await asyncio.gather(*(
+            robot.trade_async(symbol, market_data, self._async_client, decision)
+            for robot, decision in zip(self.population, decisions)
+        ))
+
+    def _mark_to_market(self, price: float):
+        """Прибыль всей популяции по текущей цене одним векторным выражением:
+        баланс + стоимость позиции по symbol - начальный баланс.
+        """
+        n = self._n
+        symbol = self.config['symbol']
+        balances = np.fromiter((r.balance for r in self.population), dtype=np.float64, count=n)
+        initial = np.fromiter((r.initial_balance for r in self.population), dtype=np.float64, count=n)
+        qtys = np.fromiter((r.positions[symbol]['qty'] if symbol in r.positions else 0.0
+                            for r in self.population), dtype=np.float64, count=n)
+        profits = self._profits[:n]
+        np.subtract(balances + qtys * float(price), initial, out=profits)
+        for robot, profit in zip(self.population, profits.tolist()):
+            robot.current_profit = profit
+
     def get_market_data(self) -> Dict[str, Any]:
         """Получение текущих рыночных данных"""
         try:
@@ -157,8 +302,8 @@ class EvolutionManager:
                 current_price = 0
                 logger.warning("Не удалось получить данные тикера")
             
-            # Получаем исторические данные
-            klines = self.client.get_klines(
+            # Получаем исторические данные (один запрос на минуту для всей популяции)
+            klines = self.client.get_klines_np(
                 self.config['symbol'], 
                 self.config['timeframe'], 
                 limit=50
@@ -171,13 +316,17 @@ class EvolutionManager:
                 'volatility': 0.02,            # Заглушка
                 'support_level': current_price * 0.98,
                 'resistance_level': current_price * 1.02,
-                'ticker_data': ticker_data if 'ticker_data' in locals() else {}
+                'ticker_data': ticker_data if 'ticker_data' in locals() else {},
+                'klines': klines
             }
+            # Индикаторы считаются один раз здесь, а не в каждом роботе
+            if hasattr(self.strategy, 'update_indicators'):
+                global_params['indicators'] = self.strategy.update_indicators(self.config['symbol'], klines)
             
             return global_params
             
         except Exception as e:
-            logger.error(f"Ошибка при получении рыночных данных: {e}")
+            logger.error("Ошибка при получении рыночных данных: %s", e)
             # Возвращаем данные по умолчанию в случае ошибки
             return {
                 'current_price': 50000.0,  # Значение по умолчанию
@@ -191,83 +340,100 @@ class EvolutionManager:
         """Расширенная оценка результатов поколения с multiple метриками"""
         logger.info("Расширенная оценка результатов поколения")
         
-        for robot in self.population:
-            # Расчет основных метрик
-            profit = robot.current_profit
+        # Метрики в SoA-матрице (6, N): фитнес всей популяции — одно скалярное произведение с весами
+        n = len(self.population)
+        metrics = np.empty((len(FITNESS_COMPONENTS), n), dtype=np.float64)
+        for j, robot in enumerate(self.population):
+            # Доходности и балансы — уже float64-представления буферов робота, без копий
             returns = robot.returns
-            
-            # Расширенные метрики
-            sharpe_ratio = AdvancedMetrics.calculate_sharpe_ratio(returns)
-            max_drawdown = AdvancedMetrics.calculate_max_drawdown(robot.balance_history)
-            profit_factor = AdvancedMetrics.calculate_profit_factor(robot.trades)
-            win_rate = AdvancedMetrics.calculate_win_rate(robot.trades)
-            consistency = AdvancedMetrics.calculate_consistency(returns)
-            
-            # Базовые компоненты
-            profit_component = profit / robot.initial_balance
-            risk_component = 1 - max_drawdown
-            
-            # Взвешенная fitness функция
-            robot.fitness = (
-                self.config['fitness_weights']['profit'] * profit_component +
-                self.config['fitness_weights']['sharpe_ratio'] * sharpe_ratio +
-                self.config['fitness_weights']['max_drawdown'] * risk_component +
-                self.config['fitness_weights']['profit_factor'] * profit_factor +
-                self.config['fitness_weights']['win_rate'] * win_rate +
-                self.config['fitness_weights']['consistency'] * consistency
+            trade_arrays = AdvancedMetrics.summarize(robot.trades)
+            metrics[:, j] = (
+                robot.current_profit / robot.initial_balance,
+                AdvancedMetrics.calculate_sharpe_ratio(returns),
+                1 - AdvancedMetrics.calculate_max_drawdown(robot.balance_history),
+                AdvancedMetrics.calculate_profit_factor(trade_arrays),
+                AdvancedMetrics.calculate_win_rate(trade_arrays),
+                AdvancedMetrics.calculate_consistency(returns),
             )
-            
-            # Логирование метрик для отладки
-            logger.debug(f"Робот {robot.robot_id}: "
-                        f"Прибыль={profit:.2f}, "
-                        f"Шарп={sharpe_ratio:.3f}, "
-                        f"Просадка={max_drawdown:.3f}, "
-                        f"Проф. фактор={profit_factor:.3f}, "
-                        f"Винрейт={win_rate:.3f}, "
-                        f"Консистентность={consistency:.3f}, "
-                        f"Фитнес={robot.fitness:.6f}")
-        
-        # Сортировка по fitness
-        self.population.sort(key=lambda x: x.fitness, reverse=True)
+
+        weights = np.array([self.config['fitness_weights'][k] for k in FITNESS_COMPONENTS], dtype=np.float64)
+        fitness = weights @ metrics
+        for robot, f in zip(self.population, fitness.tolist()):
+            robot.fitness = f
+
+        # Логирование метрик для отладки
+        if logger.isEnabledFor(logging.DEBUG):
+            for j, robot in enumerate(self.population):
+                profit_c, sharpe_ratio, risk_c, profit_factor, win_rate, consistency = metrics[:, j]
+                logger.debug("Робот %s: Прибыль=%.2f, Шарп=%.3f, Просадка=%.3f, Проф. фактор=%.3f, "
+                             "Винрейт=%.3f, Консистентность=%.3f, Фитнес=%.6f",
+                             robot.robot_id, robot.current_profit, sharpe_ratio, 1 - risk_c,
+                             profit_factor, win_rate, consistency, robot.fitness)
+
+        # Упорядочиваем только TOP_K лучших (O(N) argpartition вместо полной сортировки):
+        # дальше используются лишь элита и пул родителей, остальные идут следом в исходном порядке
+        k = min(TOP_K, n)
+        if 0 < k < n:
+            top = np.argpartition(-fitness, k - 1)[:k]
+            top = top[np.lexsort((top, -fitness[top]))]  # по убыванию fitness, при равенстве — по индексу
+            rest = np.ones(n, dtype=bool)
+            rest[top] = False
+            order = np.concatenate((top, np.flatnonzero(rest)))
+        else:
+            order = np.argsort(-fitness, kind='stable')
+        self.population = [self.population[i] for i in order]
         
         # Отбор лучших
         best_robot = self.population[0]
-        logger.info(f"Лучший робот поколения: ID {best_robot.robot_id}, "
-                   f"Фитнес: {best_robot.fitness:.6f}, "
-                   f"Прибыль: {best_robot.current_profit:.2f}")
+        logger.info("Лучший робот поколения: ID %s, Фитнес: %.6f, Прибыль: %.2f",
+                    best_robot.robot_id, best_robot.fitness, best_robot.current_profit)
+        self.best_robots.append({
+            'generation': self.generation,
+            'id': best_robot.robot_id,
+            'fitness': float(best_robot.fitness),
+            'profit': float(best_robot.current_profit),
+            'generation_born': best_robot.generation_born,
+            'survived_cycles': best_robot.survived_cycles,
+            'gene': best_robot.gene,
+        })
     
     def create_new_generation(self):
         """Создание нового поколения роботов"""
         logger.info("Создание нового поколения")
         
-        # Отбор родителей
-        parents = select_parents(self.population, elite_size=5)
+        # Гены и фитнес поколения в SoA-столбцах; отбор возвращает индексы особей
+        genes = Population.from_robots(self.population)
+        parents = select_parent_indices(genes, elite_size=5)
         
         # Создание нового поколения
         new_population = []
         
         # Добавляем элитных роботов без изменений
-        for i in range(min(5, len(parents))):
-            elite_robot = parents[i]
+        for i in parents[:5].tolist():
+            elite_robot = self.population[i]
             elite_robot.survived_cycles += 1
             new_population.append(elite_robot)
         
-        # Создаем потомков от лучших роботов
-        while len(new_population) < self.config['population_size']:
-            parent_pool = parents[:min(10, len(parents))]
-            if len(parent_pool) == 0:
-                logger.warning("Недостаточно родителей для создания нового поколения; завершаем досрочно")
-                break
-            if len(parent_pool) >= 2:
-                parent1, parent2 = np.random.choice(parent_pool, 2, replace=False)
-            else:
-                # Если только один родитель доступен — используем его дважды
-                parent1 = parent_pool[0]
-                parent2 = parent_pool[0]
+        # Создаем потомков от лучших роботов: пары родителей, скрещивание и мутация —
+        # векторно по индексам пула родителей
+        # SUS выбирает с повторами: убираем дубликаты (порядок сохраняется), чтобы пары были из разных особей
+        _, first_seen = np.unique(parents, return_index=True)
+        parent_pool = parents[np.sort(first_seen)][:10]
+        num_children = max(0, self.config['population_size'] - len(new_population))
+        if num_children > 0 and parent_pool.size == 0:
+            logger.warning("Недостаточно родителей для создания нового поколения; завершаем досрочно")
+            num_children = 0
+        if parent_pool.size >= 2:
+            # Два разных родителя на потомка: первые два столбца случайной перестановки пула
+            pairs = np.argsort(self._rng.random((num_children, parent_pool.size)), axis=1)[:, :2]
+            first, second = parent_pool[pairs[:, 0]], parent_pool[pairs[:, 1]]
+        else:
+            # Если только один родитель доступен — используем его дважды
+            first = second = np.repeat(parent_pool, num_children)
+        children = mutate_population(crossover_population(genes, first, second))
 
-            child_gene = crossover(parent1.gene, parent2.gene)
-            child_gene = mutate(child_gene)
-            
+        for p1, p2, child_gene in zip(first.tolist(), second.tolist(), children.to_genes()):
+            parent1, parent2 = self.population[p1], self.population[p2]
             child = Robot(
                 robot_id=len(new_population),
                 generation_born=self.generation + 1,
@@ -282,6 +448,7 @@ class EvolutionManager:
             new_population.append(child)
         
         self.population = new_population
+        self._refresh_population_arrays()
     
     def save_generation_history(self, start_time):
         """Сохранение истории поколения"""
@@ -299,11 +466,22 @@ class EvolutionManager:
         }
         
         self.history.append(generation_info)
+        self._record_generation_fitness(generation_info['best_robot']['fitness'], generation_info['avg_fitness'])
         
-        # Сохранение в файл
-        with open(f'data/generation_{self.generation}.json', 'w') as f:
-            json.dump(generation_info, f, indent=2)
+        # Дописываем строку в общий JSONL (без буферизации: строка на диске сразу после write)
+        if self._hist_fh is None:
+            self._hist_fh = open(HISTORY_PATH, 'ab', buffering=0)
+        if orjson is not None:
+            line = orjson.dumps(generation_info, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE)
+        else:
+            line = (json.dumps(generation_info, ensure_ascii=False) + '\n').encode('utf-8')
+        self._hist_fh.write(line)
     
+    def save_best_robots(self, path: str = 'data/best_robots.json'):
+        """Сохранение лучших роботов по поколениям (словари из evaluate_generation)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.best_robots, f, indent=2, ensure_ascii=False, default=str)
+
     def save_final_results(self):
         """Сохранение финальных результатов эволюции"""
         last_best = self.best_robots[-1] if self.best_robots else {}
@@ -315,29 +493,28 @@ class EvolutionManager:
             'execution_time': (datetime.now() - getattr(self, 'start_time', datetime.now())).total_seconds()
         }
         
-        with open('data/final_results.json', 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        try:
+            with open('data/final_results.json', 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2, ensure_ascii=False)
+        finally:
+            if self._hist_fh is not None:
+                self._hist_fh.close()
+                self._hist_fh = None
 
-    def should_continue_evolution(self):
+        self._pool.shutdown(wait=True)
+        if self._async_client is not None:
+            self._loop.run_until_complete(self._async_client.close())
+            self._loop.close()
+            self._async_client = None
+
+    def should_continue_evolution(self) -> bool:
         """Определение необходимости продолжения эволюции"""
-        if self.generation >= self.config.get('max_generations', 20):
+        if self.generation >= self.config.get('max_generations', 100):
             return False
-            
-        if (self.best_robots and 
-            self.best_robots[-1].fitness > self.config.get('target_fitness', 0.3)):
-            return False
-            
-        return True
 
-    def should_continue_evolution(self) -> bool:
-        """Проверка условий продолжения эволюции"""
-        if self.generation >= 100:  # Максимальное количество поколений
+        # best_robots хранит словари (см. save_final_results)
+        if (self.best_robots and
+                self.best_robots[-1].get('fitness', 0) > self.config.get('target_fitness', 0.3)):
             return False
-        
-        # Проверка целевой прибыли
-        if len(self.best_robots) > 0:
-            last_profit = self.best_robots[-1].current_profit
-            if last_profit >= self.config['initial_balance'] * 0.1:  # 10% прибыли
-                return True
-        
-        return True
\ No newline at end of file
+
+        return True
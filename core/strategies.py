@@ -1,61 +1,55 @@
 import talib
 import random
 import numpy as np
+from typing import Any, Dict, Tuple
 from utils.logger import setup_logger
 logger = setup_logger('robot')
 
 class SimpleStrategy:
+    # Случайные решения: buy/sell чаще, чем hold (чаще торгуем)
+    ACTIONS = ('buy', 'sell', 'hold')
+    ACTION_PROBS = (0.4, 0.4, 0.2)
+
     def __init__(self, client):
         self.client = client
         self.name = "simple_random"
+
+    @classmethod
+    def draw_decisions(cls, rng: np.random.Generator, shape) -> np.ndarray:
+        """Решения пачкой (например, роботы x минуты) одним вызовом генератора."""
+        codes = rng.choice(len(cls.ACTIONS), size=shape, p=cls.ACTION_PROBS)
+        return np.asarray(cls.ACTIONS, dtype=object)[codes]
         
-    def generate_signal(self, symbol, market_data, robot=None):
-        """Генерация торгового сигнала с использованием % от баланса"""
+    def generate_signal(self, symbol, market_data, robot=None, decision=None):
+        """Генерация торгового сигнала с использованием % от баланса.
+        decision — заранее выбранное действие (см. draw_decisions); если не задано, выбирается здесь.
+        """
         current_price = market_data['current_price']
         
         # Увеличим частоту торгов для более volatile актива like DOGE
-        decision = random.choice(['buy', 'sell', 'hold', 'buy', 'sell'])  # Чаще торгуем
+        if decision is None:
+            decision = random.choices(self.ACTIONS, weights=self.ACTION_PROBS)[0]
               
-         # Увеличим базовый процент торговли для DOGE
+        # Увеличим базовый процент торговли для DOGE
         base_trade_percentage = 0.1  # 10% вместо 5%
 
-        # Определяем объем в зависимости от символа
-        if symbol == "DOGEUSDT":
-            trade_percentage = robot.gene.get('trade_percentage', 0.1)  # 10% для DOGE
-            usd_amount = robot.balance * trade_percentage
-            qty = usd_amount / current_price
-            qty = round(qty, 0)  # Округляем до целого числа DOGE
-        else:
-            # Логика для других символов (BTCUSDT)
-            trade_percentage = robot.gene.get('trade_percentage', 0.05)
-            usd_amount = robot.balance * trade_percentage
-            qty = usd_amount / current_price
-            qty = round(qty, 4)  # 4 знака для BTC
-
         if robot:
-            # Используем персональный процент робота или базовый
-            trade_percentage = robot.gene.get('trade_percentage', base_trade_percentage)
+            # Используем персональный процент робота или базовый; объем считается один раз
+            trade_percentage = robot.trade_pct if robot.trade_pct is not None else base_trade_percentage
             usd_amount = robot.balance * trade_percentage
-            
-            # В метод generate_signal после расчета объема
-            logger.debug(f"Робот {robot.robot_id if robot else 'N/A'}: "
-                        f"баланс={robot.balance if robot else 'N/A'}, "
-                        f"процент={trade_percentage}, "
-                        f"объем={qty} {symbol}")
 
             # Для DOGE убедимся, что объем не меньше минимального
             if symbol == "DOGEUSDT":
                 min_usd_amount = 100 * current_price  # Минимальная сумма в USDT для 100 DOGE
                 if usd_amount < min_usd_amount:
                     usd_amount = min_usd_amount * 1.2  # Добавляем 20% запаса
-                
+
+            # Целое число для DOGE, 4 знака для BTC
             qty = usd_amount / current_price
-            
-            # Округляем объем в зависимости от символа
-            if symbol == "DOGEUSDT":
-                qty = round(qty)  # Целое число для DOGE
-            else:
-                qty = round(qty, 4)  # 4 знака для BTC
+            qty = round(qty) if symbol == "DOGEUSDT" else round(qty, 4)
+
+            logger.debug("Робот %s: баланс=%s, процент=%s, объем=%s %s",
+                         robot.robot_id, robot.balance, trade_percentage, qty, symbol)
         else:
             # Запасной вариант
             qty = 100  # Минимальный объем для DOGE
@@ -84,13 +78,93 @@ class SimpleStrategy:
             'reason': 'no_clear_signal'
         }
 
+# Периоды индикаторов AdvancedStrategy (значения talib по умолчанию для MACD и BBANDS)
+_RSI_PERIOD = 14
+_MACD_FAST, _MACD_SLOW, _MACD_SIGNAL = 12, 26, 9
+_BB_PERIOD, _BB_DEV = 5, 2.0
+
+
+def _ema_step(prev, count, value, period):
+    """Шаг EMA, засеянной SMA первых period значений (как в talib); count — число значений до этого шага."""
+    if count < period:
+        return prev + (value - prev) / (count + 1)
+    alpha = 2.0 / (period + 1.0)
+    return alpha * value + (1.0 - alpha) * prev
+
+
+class _IndicatorState:
+    """Состояние RSI/MACD/BBANDS после очередного закрытия: шаг по новому бару — O(1)."""
+    __slots__ = ('count', 'last_close', 'avg_gain', 'avg_loss', 'ema_fast', 'ema_slow',
+                 'macd_count', 'signal', 'bb_window')
+
+    def __init__(self):
+        self.count = 0
+        self.last_close = 0.0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.ema_fast = 0.0
+        self.ema_slow = 0.0
+        self.macd_count = 0
+        self.signal = 0.0
+        self.bb_window = ()
+
+    def step(self, close: float) -> '_IndicatorState':
+        """Новое состояние после бара с ценой закрытия close (текущее не меняется)."""
+        nxt = _IndicatorState()
+        nxt.count = self.count + 1
+        nxt.last_close = close
+        if self.count >= 1:
+            # RSI Уайлдера: первые _RSI_PERIOD изменений усредняются просто, затем сглаживание
+            delta = close - self.last_close
+            k = self.count  # номер изменения, начиная с 1
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+            n = min(k, _RSI_PERIOD)
+            nxt.avg_gain = self.avg_gain + (gain - self.avg_gain) / n
+            nxt.avg_loss = self.avg_loss + (loss - self.avg_loss) / n
+        nxt.ema_fast = _ema_step(self.ema_fast, self.count, close, _MACD_FAST)
+        nxt.ema_slow = _ema_step(self.ema_slow, self.count, close, _MACD_SLOW)
+        nxt.macd_count = self.macd_count
+        nxt.signal = self.signal
+        if nxt.count >= _MACD_SLOW:
+            nxt.signal = _ema_step(self.signal, self.macd_count, nxt.ema_fast - nxt.ema_slow, _MACD_SIGNAL)
+            nxt.macd_count = self.macd_count + 1
+        nxt.bb_window = (self.bb_window + (close,))[-_BB_PERIOD:]
+        return nxt
+
+    def values(self) -> Dict[str, float]:
+        nan = float('nan')
+        rsi = nan
+        if self.count > _RSI_PERIOD:
+            rsi = 100.0 if self.avg_loss == 0 else 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+        macd = self.ema_fast - self.ema_slow if self.count >= _MACD_SLOW else nan
+        macd_signal = self.signal if self.macd_count >= _MACD_SIGNAL else nan
+        bb_upper = bb_middle = bb_lower = nan
+        if len(self.bb_window) == _BB_PERIOD:
+            window = np.fromiter(self.bb_window, dtype=np.float64, count=_BB_PERIOD)
+            bb_middle = float(window.mean())
+            dev = _BB_DEV * float(window.std())
+            bb_upper, bb_lower = bb_middle + dev, bb_middle - dev
+        return {
+            'rsi': rsi,
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'bb_upper': bb_upper,
+            'bb_middle': bb_middle,
+            'bb_lower': bb_lower
+        }
+
+
 class AdvancedStrategy:
     def __init__(self, client):
         self.client = client
         self.name = "advanced_technical"
+        # symbol -> (open_time последнего закрытого бара, состояние индикаторов после него)
+        self._indicator_states: Dict[str, Tuple[Any, _IndicatorState]] = {}
         
     def calculate_indicators(self, historical_data):
-        closes = np.array([float(x[4]) for x in historical_data])
+        # Поле структурированного массива — страйдовое представление, talib нужен непрерывный буфер
+        closes = np.ascontiguousarray(historical_data['close'], dtype=np.float64)
         
         # RSI
         rsi = talib.RSI(closes, timeperiod=14)
@@ -110,10 +184,37 @@ class AdvancedStrategy:
             'bb_lower': lower_band[-1]
         }
     
+    def update_indicators(self, symbol, klines):
+        """Индикаторы на последнем баре klines с переиспользованием состояния прошлого вызова.
+        Последний бар еще формируется: он учитывается в значениях, но в состояние попадают
+        только закрытые бары. Если прошлый закрытый бар выпал из окна — состояние строится заново.
+        """
+        times = np.asarray(klines['open_time'])
+        closes = np.ascontiguousarray(klines['close'], dtype=np.float64)
+        if closes.size == 0:
+            return _IndicatorState().values()
+
+        start = 0
+        state = _IndicatorState()
+        cached = self._indicator_states.get(symbol)
+        if cached is not None:
+            last_time, cached_state = cached
+            pos = int(np.searchsorted(times, last_time))
+            if pos < times.size and times[pos] == last_time:
+                start, state = pos + 1, cached_state
+
+        for close in closes[start:-1].tolist():
+            state = state.step(close)
+        if closes.size >= 2:
+            self._indicator_states[symbol] = (times[-2], state)
+        return state.step(float(closes[-1])).values()
+
     def generate_signal(self, symbol, market_data, robot=None):
-        # Получаем исторические данные
-        klines = self.client.get_klines(symbol, "5", limit=50)
-        indicators = self.calculate_indicators(klines)
+        # Индикаторы, посчитанные EvolutionManager один раз на минуту; иначе — свой запрос свечей
+        indicators = market_data.get('indicators')
+        if indicators is None:
+            klines = self.client.get_klines_np(symbol, "5", limit=50)
+            indicators = self.update_indicators(symbol, klines)
         
         # Создаем сложное правило на основе индикаторов
         signal = self.complex_decision(indicators, market_data, robot)
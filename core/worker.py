@@ -1,10 +1,13 @@
-import random
-from datetime import datetime
-from time import time
+import threading
+from time import time_ns
 from typing import Any, Dict
+import numpy as np
 from utils.logger import setup_logger
 logger = setup_logger('robot')
 
+# Начальная емкость буферов баланса и доходностей робота (удваивается при заполнении)
+_HISTORY_CAPACITY = 64
+
 class Robot:
     def __init__(self, robot_id, generation_born, initial_balance, strategy, gene=None):
         self.robot_id = robot_id
@@ -12,28 +15,62 @@ class Robot:
         self.balance = initial_balance
         self.initial_balance = initial_balance
         self.strategy = strategy
-        self.gene = gene if gene else self._generate_random_gene()
-        # Список позиций: [{'symbol': str, 'qty': float, 'avg_price': float}]
-        self.positions = []
-        self.trades = []
+        if not gene:
+            # Случайные гены создает EvolutionManager._generate_random_gene (ему нужен генератор и дерево решений)
+            raise ValueError(f"Robot {robot_id}: ген обязателен (см. EvolutionManager._generate_random_gene)")
+        self.gene = gene
+        self._materialize_gene()
+        # Позиции по символу: {symbol: {'symbol': str, 'qty': float, 'avg_price': float}}
+        self.positions: Dict[str, Dict[str, Any]] = {}
+        self.trades = []  # Более детальная информация о сделках
         self.children_count = 0
         self.current_profit = 0.0
         self.survived_cycles = 0
         self.fitness = 0.0
-        self.balance_history = [initial_balance]
-        self.returns = []
-        self.trades = []  # Более детальная информация о сделках
+        # История баланса и доходностей — буферы float64 с индексом записи (см. свойства ниже)
+        self._bh = np.empty(_HISTORY_CAPACITY, dtype=np.float64)
+        self._bh[0] = initial_balance
+        self._bh_n = 1
+        self._ret = np.empty(_HISTORY_CAPACITY, dtype=np.float64)
+        self._ret_n = 0
+        # Баланс и позиции меняются из потока пула EvolutionManager
+        self._lock = threading.Lock()
         
+    def _materialize_gene(self):
+        """Параметры гена в атрибутах робота: стратегия читает их на каждом тике без dict.get.
+        Вызывать повторно, если ген заменен. Ключа может не быть (crossover переносит не все) — тогда None.
+        """
+        gene = self.gene
+        trade_pct = gene.get('trade_percentage')
+        risk = gene.get('risk_appetite')
+        max_duration = gene.get('max_trade_duration')
+        self.trade_pct = float(trade_pct) if trade_pct is not None else None
+        self.risk = float(risk) if risk is not None else None
+        self.max_trade_duration = int(max_duration) if max_duration is not None else None
+
+    @property
+    def balance_history(self) -> np.ndarray:
+        """Балансы после каждой сделки (представление буфера, без копирования)."""
+        return self._bh[:self._bh_n]
+
+    @property
+    def returns(self) -> np.ndarray:
+        """Доходности между соседними балансами (представление буфера, без копирования)."""
+        return self._ret[:self._ret_n]
+
+    @staticmethod
+    def _grow(buf: np.ndarray) -> np.ndarray:
+        grown = np.empty(buf.size * 2, dtype=buf.dtype)
+        grown[:buf.size] = buf
+        return grown
+
     def _get_position(self, symbol):
-        for p in self.positions:
-            if p['symbol'] == symbol:
-                return p
-        return None
+        return self.positions.get(symbol)
 
     def _update_position_on_buy(self, symbol: str, qty: float, price: float):
         pos = self._get_position(symbol)
         if pos is None:
-            self.positions.append({'symbol': symbol, 'qty': qty, 'avg_price': price})
+            self.positions[symbol] = {'symbol': symbol, 'qty': qty, 'avg_price': price}
             return
         total_qty = pos['qty'] + qty
         if total_qty <= 0:
@@ -51,7 +88,7 @@ class Robot:
         pos['qty'] -= qty
         if pos['qty'] <= 1e-12:
             # Удаляем позицию если закрыта
-            self.positions = [p for p in self.positions if p['symbol'] != symbol]
+            self.positions.pop(symbol, None)
 
     def _min_qty_for_symbol(self, symbol: str) -> float:
         # Минимальные объемы для отправки ордеров (для проверки до запроса)
@@ -61,114 +98,147 @@ class Robot:
         }
         return rules.get(symbol, 1.0)
         
-    def trade(self, symbol, market_data):
+    def trade(self, symbol, market_data, decision=None):
         """Выполнение торговой операции с проверкой баланса и управлением позицией"""
+        with self._lock:
+            return self._trade(symbol, market_data, decision)
+
+    async def trade_async(self, symbol, market_data, client, decision=None):
+        """То же, что trade, но ордер отправляется через BybitAsyncClient.
+        Вызывается в цикле событий EvolutionManager: робот обрабатывается одной корутиной,
+        поэтому блокировка потоков не нужна.
+        """
+        plan = self._plan_order(symbol, market_data, decision)
+        if plan is None:
+            return False
+        action, qty, price_hint = plan
+        try:
+            order = await client.place_order(**self._order_kwargs(symbol, action, qty))
+            return self._apply_order(symbol, action, qty, price_hint, order)
+        except Exception as e:
+            logger.warning("Робот %s не смог разместить ордер: %s...", self.robot_id, str(e)[:100])
+        return False
+
+    def _trade(self, symbol, market_data, decision=None):
+        plan = self._plan_order(symbol, market_data, decision)
+        if plan is None:
+            return False
+        action, qty, price_hint = plan
+        try:
+            order = self.strategy.client.place_order(**self._order_kwargs(symbol, action, qty))
+            return self._apply_order(symbol, action, qty, price_hint, order)
+        except Exception as e:
+            logger.warning("Робот %s не смог разместить ордер: %s...", self.robot_id, str(e)[:100])
+        return False
+
+    def _plan_order(self, symbol, market_data, decision=None):
+        """Сигнал стратегии и проверки до запроса: (action, qty, price_hint) или None, если ордера не будет."""
         # Запоминаем последний символ для служебных операций (закрытие и т.п.)
         self.last_symbol = symbol
         # Передаем self (робота) в метод generate_signal
-        signal = self.strategy.generate_signal(symbol, market_data, self)
+        if decision is None:
+            signal = self.strategy.generate_signal(symbol, market_data, self)
+        else:
+            signal = self.strategy.generate_signal(symbol, market_data, self, decision=decision)
         
         action = signal['action']
         desired_qty = float(signal['qty'])
         price_hint = float(signal['price'])
         min_qty = self._min_qty_for_symbol(symbol)
 
+        if action not in ('buy', 'sell'):
+            return None
+
         # Оценка стоимости ордера по сигналу (предварительная)
         est_order_cost = price_hint * desired_qty
         
         # Проверяем достаточно ли средств по оценочной цене
         if action == 'buy' and est_order_cost > self.balance:
-            logger.debug(f"Робот {self.robot_id}: недостаточно средств. Нужно {est_order_cost}, есть {self.balance}")
-            return False
+            logger.debug("Робот %s: недостаточно средств. Нужно %s, есть %s", self.robot_id, est_order_cost, self.balance)
+            return None
             
         if action == 'sell':
             pos = self._get_position(symbol)
             if pos is None or pos['qty'] <= 0:
-                logger.debug(f"Робот {self.robot_id}: нет позиции для продажи")
-                return False
+                logger.debug("Робот %s: нет позиции для продажи", self.robot_id)
+                return None
             # Корректируем объем продажи не больше доступной позиции
             desired_qty = min(desired_qty, pos['qty'])
             # Защита: если меньше минимального лота — пропускаем
             if desired_qty < min_qty:
-                logger.debug(f"Робот {self.robot_id}: объем продажи {desired_qty} меньше минимального {min_qty}")
-                return False
-        
-        try:
-            if action == 'buy':
-                order = self.strategy.client.place_order(
-                    symbol=symbol,
-                    side="Buy",
-                    order_type="Market",
-                    qty=desired_qty,
-                )
-                if order:
-                    # Используем фактическую цену исполнения, если она есть
-                    executed_price = float(order.get('executedPrice', price_hint))
-                    order_cost = executed_price * desired_qty
-                    # Вычитаем стоимость из баланса по фактической цене
-                    self.balance -= order_cost
-                    # Обновляем позицию
-                    self._update_position_on_buy(symbol, desired_qty, executed_price)
-                    # Лог сделки
-                    self.trades.append({
-                        'action': 'buy',
-                        'price': executed_price,
-                        'qty': desired_qty,
-                        'timestamp': datetime.now(),
-                        'cost': order_cost,
-                        'orderId': order.get('orderId')
-                    })
-                    return True
-                    
-            elif action == 'sell':
-                order = self.strategy.client.place_order(
-                    symbol=symbol,
-                    side="Sell",
-                    order_type="Market",
-                    qty=desired_qty,
-                    reduce_only=True,
-                )
-                if order:
-                    executed_price = float(order.get('executedPrice', price_hint))
-                    # Добавляем выручку к балансу по фактической цене
-                    revenue = executed_price * desired_qty
-                    self.balance += revenue
-                    # Обновляем позицию (уменьшаем)
-                    self._update_position_on_sell(symbol, desired_qty)
-                    # Лог сделки
-                    self.trades.append({
-                        'action': 'sell',
-                        'price': executed_price,
-                        'qty': desired_qty,
-                        'timestamp': datetime.now(),
-                        'revenue': revenue,
-                        'orderId': order.get('orderId')
-                    })
-                    return True
-                    
-        except Exception as e:
-            logger.warning(f"Робот {self.robot_id} не смог разместить ордер: {str(e)[:100]}...")
-            
-        return False
+                logger.debug("Робот %s: объем продажи %s меньше минимального %s", self.robot_id, desired_qty, min_qty)
+                return None
+
+        return action, desired_qty, price_hint
+
+    @staticmethod
+    def _order_kwargs(symbol, action, qty):
+        if action == 'buy':
+            return {'symbol': symbol, 'side': "Buy", 'order_type': "Market", 'qty': qty}
+        return {'symbol': symbol, 'side': "Sell", 'order_type': "Market", 'qty': qty, 'reduce_only': True}
+
+    def _apply_order(self, symbol, action, qty, price_hint, order):
+        """Учет исполненного ордера в балансе, позиции и журнале сделок."""
+        if not order:
+            return False
+        # Используем фактическую цену исполнения, если она есть
+        executed_price = float(order.get('executedPrice', price_hint))
+        if action == 'buy':
+            order_cost = executed_price * qty
+            # Вычитаем стоимость из баланса по фактической цене
+            self.balance -= order_cost
+            # Обновляем позицию
+            self._update_position_on_buy(symbol, qty, executed_price)
+            # Лог сделки
+            self.trades.append({
+                'action': 'buy',
+                'price': executed_price,
+                'qty': qty,
+                'ts_ns': time_ns(),  # Unix-время в нс; в datetime — только при выводе
+                'cost': order_cost,
+                'orderId': order.get('orderId')
+            })
+        else:
+            # Добавляем выручку к балансу по фактической цене
+            revenue = executed_price * qty
+            self.balance += revenue
+            # Обновляем позицию (уменьшаем)
+            self._update_position_on_sell(symbol, qty)
+            # Лог сделки
+            self.trades.append({
+                'action': 'sell',
+                'price': executed_price,
+                'qty': qty,
+                'ts_ns': time_ns(),  # Unix-время в нс; в datetime — только при выводе
+                'revenue': revenue,
+                'orderId': order.get('orderId')
+            })
+        return True
         
     def update_profit(self, current_price):
-        """Обновление информации о прибыли"""
-        # Здесь будет логика расчета текущей прибыли
-        # Пока просто случайное значение для теста
-        self.current_profit = random.uniform(-0.05, 0.1) * self.initial_balance
+        """Прибыль по рынку: баланс + стоимость позиций по current_price - начальный баланс.
+        Для всей популяции сразу см. EvolutionManager._mark_to_market.
+        """
+        position_value = sum(pos['qty'] for pos in self.positions.values()) * current_price
+        self.current_profit = self.balance + position_value - self.initial_balance
         return self.current_profit
     
     def update_after_trade(self, trade_result: Dict[str, Any]):
         self.trades.append(trade_result)
         current_balance = self.balance
-        previous_balance = self.balance_history[-1]
+        previous_balance = self._bh[self._bh_n - 1]
         
         # Расчет доходности
         if previous_balance > 0:
-            returns = (current_balance - previous_balance) / previous_balance
-            self.returns.append(returns)
+            if self._ret_n == self._ret.size:
+                self._ret = self._grow(self._ret)
+            self._ret[self._ret_n] = (current_balance - previous_balance) / previous_balance
+            self._ret_n += 1
         
-        self.balance_history.append(current_balance)
+        if self._bh_n == self._bh.size:
+            self._bh = self._grow(self._bh)
+        self._bh[self._bh_n] = current_balance
+        self._bh_n += 1
 
     def stop(self):
         self.is_running = False
@@ -183,6 +253,7 @@ class Robot:
                 # Закрываем длинные позиции на бирже
                 client.close_all_longs(symbol)
                 # Синхронно очищаем локальные позиции по этому символу
-                self.positions = [p for p in self.positions if p['symbol'] != symbol]
+                with self._lock:
+                    self.positions.pop(symbol, None)
             except Exception as e:
-                logger.error(f"Робот {self.robot_id}: Ошибка при принудительном закрытии позиций: {e}")
+                logger.error("Робот %s: Ошибка при принудительном закрытии позиций: %s", self.robot_id, e)
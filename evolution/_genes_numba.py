@@ -0,0 +1,34 @@
+"""
+Numba-ядра для числовой части мутации генов (trade_percentage, risk_appetite)
+по SoA-массивам всего поколения. Без numba выполняются как обычный Python.
+"""
+import numpy as np
+
+from utils.helpers import njit, prange, NUMBA_AVAILABLE
+
+
+@njit(cache=True, parallel=True, fastmath=True)
+def batch_mutate_numeric(trade_pcts, risks, mask_tp, mask_risk, new_tp, noise):
+    """Мутация на месте: trade_pcts[i] = new_tp[i] там, где mask_tp;
+    risks[i] = clip(risks[i] + noise[i], 0.1, 0.9) там, где mask_risk."""
+    for i in prange(trade_pcts.size):
+        if mask_tp[i]:
+            trade_pcts[i] = new_tp[i]
+        if mask_risk[i]:
+            r = risks[i] + noise[i]
+            if r < 0.1:
+                r = 0.1
+            elif r > 0.9:
+                r = 0.9
+            risks[i] = r
+
+
+def _warmup():
+    """Прогрев JIT-кеша, чтобы первое поколение не платило за компиляцию."""
+    values = np.array([0.5, 0.5], dtype=np.float64)
+    flags = np.array([True, False])
+    batch_mutate_numeric(values.copy(), values.copy(), flags, flags, values, values)
+
+
+if NUMBA_AVAILABLE:
+    _warmup()
@@ -1,38 +1,116 @@
+import os
+
 import numpy as np
-import random
+
+from ._genes_numba import batch_mutate_numeric
+from .population import Population
+
+# Генератор PCG64 модуля; в дочернем процессе после fork пересоздается, чтобы потоки чисел не совпадали
+rng = np.random.default_rng()
+
+def _reseed_after_fork():
+    global rng
+    rng = np.random.default_rng()
+
+# register_at_fork есть только на POSIX (на Windows процессы создаются через spawn и импортируют модуль заново)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reseed_after_fork)
+
+# Вероятности мутации: торговый процент, склонность к риску, дерево решений
+_MUTATION_PROBS = np.array([0.3, 0.3, 0.4])
 
 def mutate(gene: dict) -> dict:
-    """Мутация гена робота"""
+    """Мутация гена робота. Если ни одна ветка не сработала, возвращается тот же словарь
+    (без копии); иначе — новый, исходный ген не меняется."""
+    # Все случайные величины одной особи — одним вызовом на вид распределения
+    fires = rng.random(3) < _MUTATION_PROBS
+    if not fires.any():
+        return gene
     mutated_gene = gene.copy()
     
     # Мутация торгового процента
-    if random.random() < 0.3:  # 30% вероятность мутации
-        mutated_gene['trade_percentage'] = np.random.uniform(0.01, 0.1)
+    if fires[0]:  # 30% вероятность мутации
+        mutated_gene['trade_percentage'] = rng.uniform(0.01, 0.1)
     
     # Мутация склонности к риску
-    if random.random() < 0.3:
+    if fires[1]:
         mutated_gene['risk_appetite'] = np.clip(
-            gene['risk_appetite'] + np.random.normal(0, 0.1), 0.1, 0.9
+            gene['risk_appetite'] + rng.normal(0, 0.1), 0.1, 0.9
         )
     
     # Мутация дерева решений
-    if random.random() < 0.4:
-        if len(mutated_gene['decision_tree']) > 2:
-            # Удаляем случайное условие
-            if random.random() < 0.5:
-                del mutated_gene['decision_tree'][random.randint(0, len(mutated_gene['decision_tree']) - 1)]
-            # Добавляем новое условие
-            else:
-                new_condition = {
-                    'indicator': random.choice(['rsi', 'price_above_ema', 'volume']),
-                    'operator': random.choice(['<', '>', '==']),
-                    'value': random.randint(20, 80),
-                    'action': random.choice(['buy', 'sell'])
-                }
-                mutated_gene['decision_tree'].append(new_condition)
+    if fires[2]:
+        # Копия списка: дерево исходного гена не должно меняться
+        mutated_gene['decision_tree'] = list(gene['decision_tree'])
+        _mutate_decision_tree(mutated_gene['decision_tree'], *_draw_tree_mutations(1)[0])
     
     return mutated_gene
 
+# Варианты нового условия при мутации дерева
+_NEW_INDICATORS = ('rsi', 'price_above_ema', 'volume')
+_NEW_OPERATORS = ('<', '>', '==')
+_NEW_ACTIONS = ('buy', 'sell')
+
+def _draw_tree_mutations(k: int) -> list:
+    """Случайные величины для k мутаций дерева пачкой: по кортежу
+    (удалять ли, доля позиции удаляемого условия, индикатор, оператор, значение, действие)."""
+    return list(zip(
+        (rng.random(k) < 0.5).tolist(),
+        rng.random(k).tolist(),
+        rng.integers(len(_NEW_INDICATORS), size=k).tolist(),
+        rng.integers(len(_NEW_OPERATORS), size=k).tolist(),
+        rng.integers(20, 81, size=k).tolist(),
+        rng.integers(len(_NEW_ACTIONS), size=k).tolist(),
+    ))
+
+def _mutate_decision_tree(tree: list, remove: bool, position: float,
+                          indicator: int, op: int, value: int, action: int) -> None:
+    """Мутация дерева решений на месте по заранее вытянутым величинам (см. _draw_tree_mutations)."""
+    if len(tree) > 2:
+        # Удаляем случайное условие
+        if remove:
+            del tree[int(position * len(tree))]
+        # Добавляем новое условие
+        else:
+            tree.append({
+                'indicator': _NEW_INDICATORS[indicator],
+                'operator': _NEW_OPERATORS[op],
+                'value': value,
+                'action': _NEW_ACTIONS[action]
+            })
+
+def mutate_population(population: Population) -> Population:
+    """Мутация генов всего поколения на месте: те же вероятности, что у mutate, но все
+    случайные величины вытягиваются массивами на поколение, числовые столбцы мутируют
+    одним вызовом ядра, а не по словарю на особь."""
+    n = len(population)
+    if n == 0:
+        return population
+    fires = rng.random((n, 3)) < _MUTATION_PROBS
+    batch_mutate_numeric(population.trade_pct, population.risk, fires[:, 0], fires[:, 1],
+                         rng.uniform(0.01, 0.1, n), rng.normal(0, 0.1, n))
+
+    trees = population.trees
+    tree_rows = np.flatnonzero(fires[:, 2]).tolist()
+    for i, tree_draws in zip(tree_rows, _draw_tree_mutations(len(tree_rows))):
+        # Копия списка: дерево родителя не должно меняться
+        trees[i] = list(trees[i])
+        _mutate_decision_tree(trees[i], *tree_draws)
+    return population
+
+def crossover_population(parents: Population, first: np.ndarray, second: np.ndarray) -> Population:
+    """Скрещивание пар (first[k], second[k]) по индексам parents — как crossover, но
+    числовые поля усредняются векторно для всех потомков сразу."""
+    trees = parents.trees
+    child_trees = [trees[a][:len(trees[a]) // 2] + trees[b][len(trees[b]) // 2:]
+                   for a, b in zip(first.tolist(), second.tolist())]
+    return Population(
+        fitness=np.zeros(first.size, dtype=np.float64),
+        trade_pct=(parents.trade_pct[first] + parents.trade_pct[second]) / 2,
+        risk=(parents.risk[first] + parents.risk[second]) / 2,
+        trees=child_trees,
+    )
+
 def crossover(gene1: dict, gene2: dict) -> dict:
     """Скрещивание двух генов"""
     child_gene = {}
@@ -0,0 +1,37 @@
+import numpy as np
+from typing import List
+
+
+class Population:
+    """Гены поколения в SoA-виде: числовые поля — параллельные массивы float64,
+    деревья решений — список списков (слишком разнородны для массивов).
+    Особь — целочисленный индекс во всех столбцах.
+    """
+    __slots__ = ('fitness', 'trade_pct', 'risk', 'trees')
+
+    def __init__(self, fitness: np.ndarray, trade_pct: np.ndarray, risk: np.ndarray, trees: List[list]):
+        self.fitness = fitness
+        self.trade_pct = trade_pct
+        self.risk = risk
+        self.trees = trees
+
+    def __len__(self) -> int:
+        return self.fitness.size
+
+    @classmethod
+    def from_robots(cls, robots) -> 'Population':
+        """Столбцы из списка роботов (порядок сохраняется)."""
+        n = len(robots)
+        return cls(
+            fitness=np.fromiter((r.fitness for r in robots), dtype=np.float64, count=n),
+            trade_pct=np.fromiter((r.gene['trade_percentage'] for r in robots), dtype=np.float64, count=n),
+            risk=np.fromiter((r.gene['risk_appetite'] for r in robots), dtype=np.float64, count=n),
+            trees=[r.gene['decision_tree'] for r in robots],
+        )
+
+    def to_genes(self) -> List[dict]:
+        """Гены в словарном виде (как у crossover) для конструктора Robot."""
+        return [
+            {'trade_percentage': tp, 'risk_appetite': risk, 'decision_tree': tree}
+            for tp, risk, tree in zip(self.trade_pct.tolist(), self.risk.tolist(), self.trees)
+        ]
@@ -1,36 +1,51 @@
+import os
+
 import numpy as np
 from utils.logger import setup_logger
+from .population import Population
 
 logger = setup_logger('evolution_manager')
-def select_parents(population, elite_size=5):
-    """Отбор родителей для следующего поколения с защитой от некорректных размеров выборки."""
+
+# Генератор PCG64 модуля; в дочернем процессе после fork пересоздается, чтобы потоки чисел не совпадали
+rng = np.random.default_rng()
+
+def _reseed_after_fork():
+    global rng
+    rng = np.random.default_rng()
+
+# register_at_fork есть только на POSIX (на Windows процессы создаются через spawn и импортируют модуль заново)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reseed_after_fork)
+
+def select_parent_indices(population: Population, elite_size=5) -> np.ndarray:
+    """Отбор родителей по SoA-массивам поколения: индексы особей (сначала элита, затем
+    остальные по стохастической универсальной выборке, SUS) с защитой от некорректных размеров выборки.
+    SUS: одно случайное число задает sample_size равноотстоящих указателей в накопленном
+    распределении fitness — дисперсия отбора ниже, чем у независимых взвешенных выборов,
+    особь может быть выбрана несколько раз (пропорционально своей доле fitness).
+    Выбранные после элиты индексы идут в случайном порядке."""
     n = len(population)
     if n == 0:
         logger.warning("select_parents: пустая популяция")
-        return []
+        return np.empty(0, dtype=np.intp)
 
     # Приводим elite_size к допустимому диапазону
     elite_size = max(0, min(int(elite_size), n))
 
     # Отбираем элитных особей (ожидается, что популяция уже отсортирована по fitness)
-    elites = population[:elite_size]
+    elites = np.arange(elite_size)
 
     # Если больше никого отбирать не нужно
     remaining = n - elite_size
     if remaining <= 0:
         return elites
 
-    # Фитнесы и кандидаты (без элиты)
-    fitnesses = np.array([float(robot.fitness) for robot in population], dtype=float)
-    candidates = population[elite_size:]
-    cand_fitness = fitnesses[elite_size:]
-
-    # Если вдруг кандидатов нет
-    if len(candidates) == 0:
-        return elites
+    # Фитнесы кандидатов (без элиты)
+    cand_fitness = population.fitness[elite_size:]
+    num_candidates = cand_fitness.size
 
     # Сдвиг fitness к неотрицательным значениям
-    min_fit = float(np.min(cand_fitness)) if cand_fitness.size > 0 else 0.0
+    min_fit = float(cand_fitness.min())
     if min_fit < 0.0:
         shifted = cand_fitness - min_fit + 1e-12
     else:
@@ -39,7 +54,7 @@ def select_parents(population, elite_size=5):
     total = float(np.sum(shifted))
     if not np.isfinite(total) or total <= 0.0:
         # Равномерное распределение, если сумма фитнесов некорректна
-        probabilities = np.ones(len(candidates), dtype=float) / len(candidates)
+        probabilities = np.full(num_candidates, 1.0 / num_candidates)
         logger.warning("select_parents: некорректная сумма фитнесов, используется равномерное распределение")
     else:
         probabilities = shifted / total
@@ -49,10 +64,32 @@ def select_parents(population, elite_size=5):
         probabilities = probabilities / (s if s > 0 else 1.0)
 
     # Размер выборки равен количеству неконкурентных мест
-    sample_size = min(remaining, len(candidates))
-    if sample_size <= 0:
-        return elites
+    sample_size = min(remaining, num_candidates)
 
-    selected = list(np.random.choice(candidates, size=sample_size, p=probabilities, replace=False))
+    # Stochastic Universal Sampling: O(n + k), один вызов генератора
+    cdf = np.cumsum(probabilities)
+    cdf /= cdf[-1]
+    step = 1.0 / sample_size
+    pointers = rng.random() * step + step * np.arange(sample_size)
+    # side='right' и ограничение сверху: указатель на границе не попадает в особь с нулевой долей
+    selected = np.minimum(np.searchsorted(cdf, pointers, side='right'), num_candidates - 1)
+    # Указатели возрастают, значит и индексы отсортированы: перемешиваем, иначе усечение
+    # пула родителей (parents[:k]) всегда брало бы лучших по fitness, а не пропорционально ему
+    selected = rng.permutation(selected)
 
-    return elites + selected
+    return np.concatenate((elites, selected + elite_size))
+
+def select_parents(population, elite_size=5):
+    """Отбор родителей для следующего поколения с защитой от некорректных размеров выборки.
+    Список роботов на входе и на выходе; расчет — select_parent_indices по SoA-столбцам."""
+    if len(population) == 0:
+        logger.warning("select_parents: пустая популяция")
+        return []
+    # Fitness элиты при отборе не используется — читаем только кандидатов
+    n = len(population)
+    elite = max(0, min(int(elite_size), n))
+    fitness = np.zeros(n, dtype=np.float64)
+    fitness[elite:] = np.fromiter((float(robot.fitness) for robot in population[elite:]),
+                                  dtype=np.float64, count=n - elite)
+    indices = select_parent_indices(Population(fitness, None, None, None), elite_size)
+    return [population[i] for i in indices.tolist()]
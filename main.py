@@ -1,7 +1,8 @@
 # main.py
 from core.bybit_client import BybitClient
 from core.master import EvolutionManager
-from analysis.visualizer import RaceVisualizer, MetricsVisualizer
+from analysis.visualizer import MetricsVisualizer
+from analysis.visualizer_gl import create_race_visualizer
 from config.settings import load_config
 import logging
 import time
@@ -44,27 +45,32 @@ def main():
         logger.info("Проверка подключения к API...")
         key_info = client.get_api_key_info()
         if key_info:
-            logger.info(f"[УСПЕХ] API Key информация получена:")
-            logger.info(f"   - Права: {key_info.get('permissions', {})}")
-            logger.info(f"   - UTA статус: {key_info.get('uta', 'N/A')} (1 = UTA аккаунт)")
+            logger.info("[УСПЕХ] API Key информация получена:")
+            logger.info("   - Права: %s", key_info.get('permissions', {}))
+            logger.info("   - UTA статус: %s (1 = UTA аккаунт)", key_info.get('uta', 'N/A'))
         else:
             logger.warning("Не удалось получить информацию о API ключе")
         
         # Проверка баланса
         logger.info("Проверка баланса...")
         balance = client.get_account_balance()
-        logger.info(f"[БАЛАНС] Баланс кошелька: {balance} USDT")
+        logger.info("[БАЛАНС] Баланс кошелька: %s USDT", balance)
         
         # Проверка минимального баланса
         min_balance = 100.0
         if balance < min_balance:
-            logger.error(f"Недостаточный баланс: {balance} < {min_balance}. Пополните тестовый счет.")
+            logger.error("Недостаточный баланс: %s < %s. Пополните тестовый счет.", balance, min_balance)
             return
         
         # Тестирование получения тикера
         logger.info("Тестирование получения данных тикера...")
         ticker = client.get_ticker(config['symbol'])
-        logger.info(f"Данные тикера получены: {bool(ticker)}")
+        logger.info("Данные тикера получены: %s", bool(ticker))
+
+        # Фильтры инструмента заранее, чтобы первый ордер не ждал лишний запрос
+        client.preload_filters([config['symbol']])
+        # Тикер по WebSocket: роботы не опрашивают REST на каждом шаге
+        client.subscribe_tickers([config['symbol']])
         
         # Создание мастера эволюции
         logger.info("Создание мастера эволюции...")
@@ -72,7 +78,7 @@ def main():
         
         # Создание визуализаторов
         logger.info("Создание визуализаторов...")
-        race_visualizer = RaceVisualizer(evolution_manager)
+        race_visualizer = create_race_visualizer(evolution_manager)
         metrics_visualizer = MetricsVisualizer()
         
         # Основной цикл эволюции
@@ -81,12 +87,12 @@ def main():
         max_generations = 2  # Два поколения для проверки непрерывной торговли
         
         while generation_count < max_generations and evolution_manager.should_continue_evolution():
-            logger.info(f"=== ПОКОЛЕНИЕ {generation_count} ===")
+            logger.info("=== ПОКОЛЕНИЕ %s ===", generation_count)
             
             try:
                 # Запуск поколения
                 evolution_manager.run_generation()
-                logger.info(f"Поколение {generation_count} завершено успешно")
+                logger.info("Поколение %s завершено успешно", generation_count)
                 
                 # Обновление визуализации
                 race_visualizer.update()
@@ -96,11 +102,11 @@ def main():
                 
                 # Сохранение лучших роботов если превышен порог fitness
                 if (evolution_manager.best_robots and 
-                    evolution_manager.best_robots[-1].fitness > config.get('fitness_threshold', 0.15)):
+                    evolution_manager.best_robots[-1]['fitness'] > config.get('fitness_threshold', 0.15)):
                     evolution_manager.save_best_robots()
                 
             except Exception as e:
-                logger.error(f"Ошибка в поколении {generation_count}: {e}")
+                logger.error("Ошибка в поколении %s: %s", generation_count, e)
                 import traceback
                 traceback.print_exc()
                 # Продолжаем выполнение несмотря на ошибку
@@ -111,13 +117,14 @@ def main():
         # Финальный отчет
         logger.info("=== ЭВОЛЮЦИЯ ЗАВЕРШЕНА ===")
         
-        if hasattr(evolution_manager, 'best_robots') and evolution_manager.best_robots:
+        if evolution_manager.best_robots:
+            # best_robots — словари (см. EvolutionManager.evaluate_generation)
             best_robot = evolution_manager.best_robots[-1]
-            logger.info(f"Лучший робот: ID {best_robot.robot_id}")
-            logger.info(f"Прибыль: {best_robot.current_profit:.2f} USDT")
-            logger.info(f"Фитнес: {best_robot.fitness:.6f}")
-            logger.info(f"Поколение рождения: {best_robot.generation_born}")
-            logger.info(f"Пережито циклов: {best_robot.survived_cycles}")
+            logger.info("Лучший робот: ID %s", best_robot['id'])
+            logger.info("Прибыль: %.2f USDT", best_robot['profit'])
+            logger.info("Фитнес: %.6f", best_robot['fitness'])
+            logger.info("Поколение рождения: %s", best_robot['generation_born'])
+            logger.info("Пережито циклов: %s", best_robot['survived_cycles'])
         else:
             logger.info("Нет данных о лучших роботах")
             
@@ -125,9 +132,11 @@ def main():
         evolution_manager.save_final_results()
         
     except Exception as e:
-        logger.error(f"Критическая ошибка в main: {e}")
+        logger.error("Критическая ошибка в main: %s", e)
         import traceback
         traceback.print_exc()
+    finally:
+        BybitClient.close_all()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
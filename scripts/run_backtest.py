@@ -1,7 +1,7 @@
 import argparse
 import os
 import sys
-from datetime import datetime
+import numpy as np
 import pandas as pd
 
 # Ensure repo root on sys.path
@@ -11,12 +11,24 @@ if REPO_ROOT not in sys.path:
     sys.path.insert(0, REPO_ROOT)
 
 from backtest.engine import BacktestEngine
+from backtest.kline_cache import cached_klines
 from backtest.strategies.gene_driven import GeneDrivenBtStrategy
 from config.settings import load_config
 
 
+_OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+try:
+    import pyarrow  # noqa: F401  (multithreaded CSV parser for pd.read_csv)
+    _CSV_ENGINE = {'engine': 'pyarrow'}
+except ImportError:
+    _CSV_ENGINE = {}
+
+
 def load_csv(csv_path: str, timeframe_hint: str = "5m") -> pd.DataFrame:
-    df = pd.read_csv(csv_path)
+    # Numeric columns get explicit float64 dtypes (no type inference pass); pyarrow engine when available
+    header = pd.read_csv(csv_path, nrows=0).columns
+    dtypes = {c: np.float64 for c in header if c.lower() in _OHLCV_COLUMNS}
+    df = pd.read_csv(csv_path, dtype=dtypes, **_CSV_ENGINE)
     # Expect columns: open_time, open, high, low, close, volume
     # Try common variants
     colmap = {c.lower(): c for c in df.columns}
@@ -39,64 +51,42 @@ def load_csv(csv_path: str, timeframe_hint: str = "5m") -> pd.DataFrame:
         pick('close'): 'close',
         pick('volume'): 'volume',
     })
-    # Ensure ordering
-    df = df[['open_time', 'open', 'high', 'low', 'close', 'volume']].copy()
+    # Ensure ordering (column selection already returns a new frame)
+    df = df[['open_time', 'open', 'high', 'low', 'close', 'volume']]
     return df
 
 
+@cached_klines
 def load_bybit_klines(symbol: str, interval: str, limit: int = 1000, page_size: int = 1000) -> pd.DataFrame:
     # Lazy import to avoid dependency when not needed
     from core.bybit_client import BybitClient
     client = BybitClient(testnet=True)
 
-    all_items = []
+    pages = []
     fetched = 0
     end_ts = None  # we will page backwards in time using 'end'
 
     while fetched < limit:
         req_size = min(page_size, limit - fetched)
-        raw = client.get_klines(symbol, interval, limit=req_size, end=end_ts) or []
-        if not raw:
+        # get_klines returns an ascending OHLCV DataFrame
+        page = client.get_klines(symbol, interval, limit=req_size, end=end_ts)
+        if page is None or page.empty:
             break
-        # Ensure ascending by time
-        try:
-            raw.sort(key=lambda x: int(x[0]))
-        except Exception:
-            pass
-        all_items = raw + all_items  # prepend older data to the front if end was used
-        fetched = len(all_items)
+        pages.insert(0, page)  # prepend older data to the front if end was used
+        fetched += len(page)
         # Prepare next page end (earliest ts - 1 ms)
-        try:
-            earliest_ts = int(raw[0][0])
-            end_ts = earliest_ts - 1
-        except Exception:
-            break
+        end_ts = page['open_time'].iloc[0].value // 1_000_000 - 1
         # Safety: stop if no progress
-        if req_size > 0 and len(raw) < req_size:
+        if req_size > 0 and len(page) < req_size:
             break
 
+    if not pages:
+        return pd.DataFrame()
     # Deduplicate by timestamp and keep ascending order
-    uniq = {}
-    for it in all_items:
-        try:
-            ts = int(it[0])
-            uniq[ts] = it
-        except Exception:
-            continue
-    ordered = [uniq[k] for k in sorted(uniq.keys())]
-
-    rows = []
-    for it in ordered:
-        try:
-            ts = int(it[0])
-            open_, high, low, close, volume = map(float, [it[1], it[2], it[3], it[4], it[5]])
-            rows.append({
-                'open_time': datetime.utcfromtimestamp(ts/1000.0),
-                'open': open_, 'high': high, 'low': low, 'close': close, 'volume': float(volume)
-            })
-        except Exception:
-            continue
-    df = pd.DataFrame(rows)
+    df = pd.concat(pages, ignore_index=True).drop_duplicates('open_time', ignore_index=True)
+    # Pages are prepended oldest-first, so the frame is normally already ascending: sort only if not
+    if not df['open_time'].is_monotonic_increasing:
+        df = df.sort_values('open_time', ignore_index=True)
     return df
 
 
@@ -107,6 +97,8 @@ def main():
     parser.add_argument('--interval', type=str, default=None, help='Bybit interval (e.g., 5) if fetching')
     parser.add_argument('--limit', type=int, default=1000)
     parser.add_argument('--printlog', action='store_true')
+    parser.add_argument('--engine', choices=('backtrader', 'vbt'), default='backtrader',
+                        help='backtrader (default) or vbt: vectorized vectorbt run (no time-based exit)')
     args = parser.parse_args()
 
     cfg = load_config()
@@ -125,11 +117,6 @@ def main():
     if df.empty:
         raise SystemExit('No data loaded for backtest')
 
-    engine = BacktestEngine(
-        initial_cash=float(cfg.get('initial_balance', 1000.0)),
-        commission=0.0006,
-    )
-
     # Map config/gene defaults to strategy params (adjust as needed)
     strat_params = dict(
         trade_perc=float(cfg.get('global_trade_percentage', 0.1)),
@@ -151,7 +138,14 @@ def main():
         printlog=args.printlog,
     )
 
-    result = engine.run(GeneDrivenBtStrategy, df, strat_params, timeframe=str(timeframe), printlog=args.printlog)
+    initial_cash = float(cfg.get('initial_balance', 1000.0))
+    if args.engine == 'vbt':
+        from backtest.engine_vbt import VbtEngine
+        vbt_params = {k: v for k, v in strat_params.items() if k not in ('printlog', 'force_first_entry')}
+        result = VbtEngine(initial_cash=initial_cash, commission=0.0006).run_batch([vbt_params], df)[0]
+    else:
+        engine = BacktestEngine(initial_cash=initial_cash, commission=0.0006)
+        result = engine.run(GeneDrivenBtStrategy, df, strat_params, timeframe=str(timeframe), printlog=args.printlog)
 
     print("\nBacktest finished")
     print(f"Final Value: {result.final_value:.2f}")
@@ -1,7 +1,9 @@
 import argparse
 import os
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
 from typing import List, Dict, Any
+import numpy as np
 import pandas as pd
 
 # Ensure imports from repo
@@ -11,13 +13,25 @@ REPO_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
 if REPO_ROOT not in sys.path:
     sys.path.insert(0, REPO_ROOT)
 
-from backtest.engine import BacktestEngine
+from backtest.engine import BacktestEngine, FEED_COLUMNS, to_feed_arrays
+from backtest.kline_cache import cached_klines
 from backtest.strategies.gene_driven import GeneDrivenBtStrategy
 from config.settings import load_config
 
 
+_OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+try:
+    import pyarrow  # noqa: F401  (multithreaded CSV parser for pd.read_csv)
+    _CSV_ENGINE = {'engine': 'pyarrow'}
+except ImportError:
+    _CSV_ENGINE = {}
+
+
 def load_csv(csv_path: str) -> pd.DataFrame:
-    df = pd.read_csv(csv_path)
+    # Numeric columns get explicit float64 dtypes (no type inference pass); pyarrow engine when available
+    header = pd.read_csv(csv_path, nrows=0).columns
+    dtypes = {c: np.float64 for c in header if c.lower() in _OHLCV_COLUMNS}
+    df = pd.read_csv(csv_path, dtype=dtypes, **_CSV_ENGINE)
     colmap = {c.lower(): c for c in df.columns}
     def pick(name):
         return colmap.get(name, name)
@@ -36,50 +50,81 @@ def load_csv(csv_path: str) -> pd.DataFrame:
         pick('close'): 'close',
         pick('volume'): 'volume',
     })
-    df = df[['open_time', 'open', 'high', 'low', 'close', 'volume']].copy()
-    return df
+    # Column selection already returns a new frame
+    return df[['open_time', 'open', 'high', 'low', 'close', 'volume']]
 
 
+@cached_klines
 def load_bybit_klines(symbol: str, interval: str, limit: int = 3000, page_size: int = 1000) -> pd.DataFrame:
     from core.bybit_client import BybitClient
     client = BybitClient(testnet=True)
-    all_items = []
+    pages = []
     fetched = 0
     end_ts = None
     while fetched < limit:
         req_size = min(page_size, limit - fetched)
-        raw = client.get_klines(symbol, interval, limit=req_size, end=end_ts) or []
-        if not raw:
-            break
-        try:
-            raw.sort(key=lambda x: int(x[0]))
-        except Exception:
-            pass
-        all_items = raw + all_items
-        fetched = len(all_items)
-        try:
-            earliest_ts = int(raw[0][0])
-            end_ts = earliest_ts - 1
-        except Exception:
+        page = client.get_klines(symbol, interval, limit=req_size, end=end_ts)
+        if page is None or page.empty:
             break
-        if req_size > 0 and len(raw) < req_size:
+        pages.insert(0, page)
+        fetched += len(page)
+        end_ts = page['open_time'].iloc[0].value // 1_000_000 - 1
+        if req_size > 0 and len(page) < req_size:
             break
-    uniq = {}
-    for it in all_items:
-        try:
-            ts = int(it[0]); uniq[ts] = it
-        except Exception:
-            continue
-    ordered = [uniq[k] for k in sorted(uniq.keys())]
-    rows = []
-    for it in ordered:
-        try:
-            ts = int(it[0])
-            o, h, l, c, v = map(float, [it[1], it[2], it[3], it[4], it[5]])
-            rows.append({'open_time': datetime.utcfromtimestamp(ts/1000.0), 'open': o, 'high': h, 'low': l, 'close': c, 'volume': float(v)})
-        except Exception:
-            continue
-    return pd.DataFrame(rows)
+    if not pages:
+        return pd.DataFrame()
+    df = pd.concat(pages, ignore_index=True).drop_duplicates('open_time', ignore_index=True)
+    # Pages are prepended oldest-first, so the frame is normally already ascending: sort only if not
+    if not df['open_time'].is_monotonic_increasing:
+        df = df.sort_values('open_time', ignore_index=True)
+    return df
+
+
+# Per-process engine over feed arrays that live in one shared-memory block (see _share_feed_arrays)
+_ENGINE: BacktestEngine = None
+_SHM: shared_memory.SharedMemory = None
+# Indicator arrays already computed in this worker, shared by all its robots (same data)
+_INDICATOR_CACHE: Dict[Any, Any] = {}
+
+
+def _share_feed_arrays(df: pd.DataFrame) -> shared_memory.SharedMemory:
+    """Copy the feed columns once into a (len(FEED_COLUMNS), rows) float64 shared-memory block."""
+    arrays = to_feed_arrays(df)
+    rows = len(df)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(FEED_COLUMNS) * rows * 8))
+    block = np.ndarray((len(FEED_COLUMNS), rows), dtype=np.float64, buffer=shm.buf)
+    for i, col in enumerate(FEED_COLUMNS):
+        block[i] = arrays[col]
+    return shm
+
+
+def _init_worker(shm_name: str, rows: int, initial_cash: float, commission: float) -> None:
+    global _ENGINE, _SHM
+    # Attach without copying; keep the handle alive for the lifetime of the worker.
+    # Only the parent owns (and unlinks) the block: workers must not register it with the resource tracker
+    if sys.version_info >= (3, 13):
+        _SHM = shared_memory.SharedMemory(name=shm_name, track=False)
+    else:
+        _SHM = shared_memory.SharedMemory(name=shm_name)
+        if os.name == 'posix':
+            resource_tracker.unregister(_SHM._name, 'shared_memory')
+    block = np.ndarray((len(FEED_COLUMNS), rows), dtype=np.float64, buffer=_SHM.buf)
+    arrays = {col: block[i] for i, col in enumerate(FEED_COLUMNS)}
+    _ENGINE = BacktestEngine(initial_cash=initial_cash, commission=commission, arrays=arrays)
+    _INDICATOR_CACHE.clear()
+
+
+def _run_one(rid: int, params: Dict[str, Any], timeframe: str, printlog: bool) -> Dict[str, Any]:
+    """Backtest one robot in a worker; returns plain data only (no Backtrader objects to pickle)."""
+    params = dict(params, indicator_cache=_INDICATOR_CACHE)
+    res = _ENGINE.run(GeneDrivenBtStrategy, None, params, timeframe=timeframe, printlog=printlog)
+    return {
+        'robot_id': rid,
+        'buy_signals': res.buy_signals,
+        'sell_signals': res.sell_signals,
+        'exit_signals': res.exit_signals,
+        'equity_curve': res.equity_curve,
+    }
 
 
 def build_population_report(df: pd.DataFrame, results: List[Dict[str, Any]], out_path: str) -> None:
@@ -91,47 +136,44 @@ def build_population_report(df: pd.DataFrame, results: List[Dict[str, Any]], out
     fig.add_candlestick(row=1, col=1,
                         x=df['open_time'], open=df['open'], high=df['high'], low=df['low'], close=df['close'],
                         name='Candles')
-    # Signals per robot
+    # Signals per robot: traces are collected and added in one call per subplot
+    signal_styles = (
+        ('buy_signals', 'BUY', dict(symbol='triangle-up', size=8, line=dict(width=1, color='black'))),
+        ('sell_signals', 'SELL', dict(symbol='triangle-down', size=8, line=dict(width=1, color='black'))),
+        ('exit_signals', 'EXIT', dict(symbol='x', size=9, line=dict(width=2, color='white'))),
+    )
+    signal_traces = []
     for r in results:
         rid = r['robot_id']
-        color = r['color']
-        # BUY
-        if r['buy_signals']:
-            xs = [p[0] for p in r['buy_signals']]
-            ys = [p[1] for p in r['buy_signals']]
-            hover = [f"Robot {rid}<br>BUY<br>Price: {y:.2f}" for y in ys]
-            fig.add_trace(go.Scatter(x=xs, y=ys, mode='markers', name=f"R{rid} BUY",
-                                     marker=dict(color=color, symbol='triangle-up', size=8, line=dict(width=1, color='black')),
-                                     hovertext=hover, hoverinfo='text', legendgroup=f"R{rid}"), row=1, col=1)
-        # SELL
-        if r['sell_signals']:
-            xs = [p[0] for p in r['sell_signals']]
-            ys = [p[1] for p in r['sell_signals']]
-            hover = [f"Robot {rid}<br>SELL<br>Price: {y:.2f}" for y in ys]
-            fig.add_trace(go.Scatter(x=xs, y=ys, mode='markers', name=f"R{rid} SELL",
-                                     marker=dict(color=color, symbol='triangle-down', size=8, line=dict(width=1, color='black')),
-                                     hovertext=hover, hoverinfo='text', legendgroup=f"R{rid}"), row=1, col=1)
-        # EXIT
-        if r['exit_signals']:
-            xs = [p[0] for p in r['exit_signals']]
-            ys = [p[1] for p in r['exit_signals']]
-            hover = [f"Robot {rid}<br>EXIT<br>Price: {y:.2f}" for y in ys]
-            fig.add_trace(go.Scatter(x=xs, y=ys, mode='markers', name=f"R{rid} EXIT",
-                                     marker=dict(color=color, symbol='x', size=9, line=dict(width=2, color='white')),
-                                     hovertext=hover, hoverinfo='text', legendgroup=f"R{rid}"), row=1, col=1)
+        for key, label, marker in signal_styles:
+            points = r[key]
+            if not points:
+                continue
+            xs = [p[0] for p in points]
+            ys = [p[1] for p in points]
+            hover = [f"Robot {rid}<br>{label}<br>Price: {y:.2f}" for y in ys]
+            signal_traces.append(go.Scatter(x=xs, y=ys, mode='markers', name=f"R{rid} {label}",
+                                            marker=dict(color=r['color'], **marker),
+                                            hovertext=hover, hoverinfo='text', legendgroup=f"R{rid}"))
+    if signal_traces:
+        fig.add_traces(signal_traces, rows=[1] * len(signal_traces), cols=[1] * len(signal_traces))
     # Equity (optional top N)
+    equity_traces = []
     for r in results:
         if r.get('equity_curve'):
             xs = [p[0] for p in r['equity_curve']]
             ys = [p[1] for p in r['equity_curve']]
-            fig.add_trace(go.Scatter(x=xs, y=ys, mode='lines', name=f"R{r['robot_id']} Equity",
-                                     line=dict(color=r['color'], width=1.5), legendgroup=f"R{r['robot_id']}"), row=2, col=1)
+            equity_traces.append(go.Scatter(x=xs, y=ys, mode='lines', name=f"R{r['robot_id']} Equity",
+                                            line=dict(color=r['color'], width=1.5), legendgroup=f"R{r['robot_id']}"))
+    if equity_traces:
+        fig.add_traces(equity_traces, rows=[2] * len(equity_traces), cols=[1] * len(equity_traces))
     # Volume
-    colors = ['#26a69a' if c >= o else '#ef5350' for c, o in zip(df['close'], df['open'])]
+    colors = np.where(df['close'].to_numpy() >= df['open'].to_numpy(), '#26a69a', '#ef5350')
     fig.add_bar(row=3, col=1, x=df['open_time'], y=df['volume'], marker_color=colors, name='Volume')
     fig.update_layout(template='plotly_dark', title='Population Backtest Report', xaxis_rangeslider_visible=False)
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    fig.write_html(out_path)
+    # plotly.js from the CDN keeps each report ~3 MB smaller; traces were validated when built
+    fig.write_html(out_path, include_plotlyjs='cdn', validate=False)
 
 
 def main():
@@ -144,6 +186,7 @@ def main():
     parser.add_argument('--report', type=str, required=True, help='Output HTML path')
     parser.add_argument('--seed', type=int, default=42, help='Random seed for reproducibility')
     parser.add_argument('--printlog', action='store_true')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
     args = parser.parse_args()
 
     cfg = load_config()
@@ -159,8 +202,8 @@ def main():
     if df.empty:
         raise SystemExit('No data loaded')
 
-    # Engine
-    engine = BacktestEngine(initial_cash=float(cfg.get('initial_balance', 1000.0)), commission=0.0006)
+    initial_cash = float(cfg.get('initial_balance', 1000.0))
+    commission = 0.0006
 
     # Simple color palette
     palette = [
@@ -193,9 +236,10 @@ def main():
         # Decision tree: keep base logic
         return p
 
-    results_for_plot: List[Dict[str, Any]] = []
-
-    for rid in range(args.count):
+    # Parameters are drawn here, in robot order, so the seed gives the same population
+    # regardless of how many workers run the backtests
+    robot_params: List[Dict[str, Any]] = []
+    for _ in range(args.count):
         base_params = dict(
             trade_perc=float(cfg.get('global_trade_percentage', 0.1)),
             rsi_period=14,
@@ -212,17 +256,23 @@ def main():
                 {'indicator': 'rsi', 'operator': '>', 'value': 65, 'action': 'sell'},
             ],
         )
-        params = random_params(base_params)
-        params['robot_id'] = rid
-        res = engine.run(GeneDrivenBtStrategy, df, params, timeframe=str(timeframe), printlog=args.printlog)
-        results_for_plot.append({
-            'robot_id': rid,
-            'color': palette[rid % len(palette)],
-            'buy_signals': res.buy_signals,
-            'sell_signals': res.sell_signals,
-            'exit_signals': res.exit_signals,
-            'equity_curve': res.equity_curve,
-        })
+        robot_params.append(random_params(base_params))
+
+    # Backtests are independent and CPU-bound: run them on all cores.
+    # Workers attach to the OHLCV block by name instead of receiving a pickled DataFrame.
+    workers = args.workers or os.cpu_count() or 1
+    shm = _share_feed_arrays(df)
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, max(args.count, 1)), initializer=_init_worker,
+                                 initargs=(shm.name, len(df), initial_cash, commission)) as ex:
+            futures = [ex.submit(_run_one, rid, params, str(timeframe), args.printlog)
+                       for rid, params in enumerate(robot_params)]
+            results_for_plot: List[Dict[str, Any]] = [f.result() for f in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+    for r in results_for_plot:
+        r['color'] = palette[r['robot_id'] % len(palette)]
 
     build_population_report(df, results_for_plot, args.report)
     print(f"Saved population report to {args.report}")
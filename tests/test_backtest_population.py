@@ -0,0 +1,47 @@
+"""End-to-end smoke test: one robot through the population worker path (shared memory, engine, report data)."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+
+import run_backtest_population as population
+
+
+def _synthetic_klines(rows=300):
+    rng = np.random.default_rng(1)
+    close = 30000.0 + np.cumsum(rng.normal(0.0, 50.0, rows))
+    return pd.DataFrame({
+        'open_time': pd.date_range('2024-01-01', periods=rows, freq='5min'),
+        'open': close + rng.normal(0.0, 5.0, rows),
+        'high': close + 20.0,
+        'low': close - 20.0,
+        'close': close,
+        'volume': rng.uniform(1.0, 10.0, rows),
+    })
+
+
+def test_run_one_robot_end_to_end():
+    df = _synthetic_klines()
+    shm = population._share_feed_arrays(df)
+    try:
+        # Same initializer the process pool uses, run in-process
+        population._init_worker(shm.name, len(df), 1000.0, 0.0006)
+        params = dict(trade_perc=0.1, max_bars_in_pos=5, force_first_entry=True, decision_tree=[
+            {'indicator': 'rsi', 'operator': '<', 'value': 35, 'action': 'buy'},
+            {'indicator': 'rsi', 'operator': '>', 'value': 65, 'action': 'sell'},
+        ])
+        result = population._run_one(0, params, '5', False)
+    finally:
+        population._SHM.close()
+        shm.close()
+        shm.unlink()
+
+    assert result['robot_id'] == 0
+    assert result['buy_signals'], 'forced first entry must produce a buy'
+    assert result['equity_curve']
+    assert all(isinstance(value, float) for _, value in result['equity_curve'])
@@ -0,0 +1,18 @@
+"""Position helpers of core.bybit_client that do not touch the network."""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from core.bybit_client import _long_qty_total
+
+
+def test_long_qty_total_skips_unparseable_rows():
+    positions = [
+        {'side': 'Buy', 'size': '0.010'},
+        {'side': 'Buy', 'size': 'n/a'},      # bad row: counted as zero, not an error
+        {'side': 'Buy', 'size': ''},
+        {'side': 'Sell', 'size': '5'},       # short: ignored
+        {'side': 'long', 'qty': 0.005},
+    ]
+    assert abs(_long_qty_total(positions) - 0.015) < 1e-12
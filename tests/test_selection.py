@@ -0,0 +1,28 @@
+"""Parent selection: SUS picks beyond the fitness-sorted top of the pool."""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from evolution import selection
+from evolution.population import Population
+
+
+def test_sus_selection_reaches_beyond_top_ten():
+    # 50 robots sorted by fitness, as evaluate_generation leaves them
+    fitness = np.linspace(1.0, 0.5, 50)
+    population = Population(fitness, None, None, None)
+    selection.rng = np.random.default_rng(0)
+
+    seen_outside_top = False
+    for _ in range(20):
+        parents = selection.select_parent_indices(population, elite_size=5)
+        assert parents[:5].tolist() == [0, 1, 2, 3, 4]
+        # Same pool construction as EvolutionManager.create_new_generation
+        _, first_seen = np.unique(parents, return_index=True)
+        pool = parents[np.sort(first_seen)][:10]
+        assert len(set(pool.tolist())) == pool.size
+        seen_outside_top |= bool((pool >= 10).any())
+    assert seen_outside_top
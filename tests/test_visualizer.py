@@ -0,0 +1,39 @@
+"""Smoke test for analysis.visualizer: both visualizers draw from a tiny population."""
+import os
+import sys
+from types import SimpleNamespace
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from analysis.visualizer import MetricsVisualizer, RaceVisualizer
+
+
+def _manager(n=3):
+    return SimpleNamespace(
+        config={'population_size': n},
+        population=[object()] * n,
+        profits=np.array([0.0, 1.5, -2.0][:n]),
+        ids=np.arange(n),
+        cycles=np.zeros(n, dtype=np.int64),
+        children=np.ones(n, dtype=np.int64),
+        best_fitness_history=np.array([0.1, 0.2]),
+        avg_fitness_history=np.array([0.05, 0.1]),
+    )
+
+
+def test_race_visualizer_update():
+    viz = RaceVisualizer(_manager())
+    artists = viz.update()
+    assert viz.scatter.get_offsets().shape == (3, 2)
+    assert sum(label.get_visible() for label in viz._labels) == 3
+    assert artists[0] is viz.scatter
+
+
+def test_metrics_visualizer_saves_plot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    MetricsVisualizer().plot_generation_metrics(_manager())
+    assert (tmp_path / 'fitness_evolution.png').exists()
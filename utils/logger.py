@@ -1,22 +1,37 @@
 import logging
+import logging.handlers
 import os
 
-def setup_logger(name, log_file='logs/evolution.log', level=logging.INFO):
-    """Настройка логгера"""
+# Обработчики по пути файла: все логгеры пишут в файл через один RotatingFileHandler
+# (несколько ротирующих обработчиков на одном файле ротировали бы его независимо)
+_FILE_HANDLERS = {}
+_FORMATTER = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+def _file_handler(log_file):
+    handler = _FILE_HANDLERS.get(log_file)
+    if handler is None:
+        handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=10_000_000, backupCount=3,
+                                                       encoding='utf-8')
+        handler.setFormatter(_FORMATTER)
+        _FILE_HANDLERS[log_file] = handler
+    return handler
+
+def setup_logger(name, log_file='logs/evolution.log', level=None):
+    """Настройка логгера. Повторный вызов с тем же именем возвращает уже настроенный
+    логгер, не добавляя обработчики (иначе каждая запись дублируется).
+    Уровень по умолчанию — из переменной окружения LOGLEVEL (INFO, если не задана)."""
+    logger = logging.getLogger(name)
+    if logger.handlers:
+        return logger
+
     if not os.path.exists('logs'):
         os.makedirs('logs')
-    
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    
-    handler = logging.FileHandler(log_file, encoding='utf-8')
-    handler.setFormatter(formatter)
-    
+
     console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
-    logger.addHandler(handler)
+    console_handler.setFormatter(_FORMATTER)
+
+    logger.setLevel(level if level is not None else os.environ.get('LOGLEVEL', 'INFO').upper())
+    logger.addHandler(_file_handler(log_file))
     logger.addHandler(console_handler)
-    
-    return logger
\ No newline at end of file
+
+    return logger